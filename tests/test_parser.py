@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Tests for wiktts.mw.parser, comparing the fast engine against lxml.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from wiktts.mw.parser import Parser
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+HEADER = u"""<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="en">
+  <siteinfo>
+    <sitename>Wiktionary</sitename>
+  </siteinfo>
+"""
+
+FOOTER = u"""</mediawiki>
+"""
+
+PAGE = u"""  <page>
+    <title>%s</title>
+    <ns>%s</ns>
+    <id>%s</id>
+%s  </page>
+"""
+
+REVISION = u"""    <revision>
+      <id>%s</id>
+      <timestamp>2016-01-11T07:48:16Z</timestamp>
+      %s
+      <sha1>%s</sha1>
+    </revision>
+"""
+
+def revision(revision_id, text):
+    return REVISION % (revision_id, text, u"sha%s" % revision_id)
+
+def text(contents):
+    return u"<text xml:space=\"preserve\">%s</text>" % contents
+
+PAGES = [
+    # named and numeric entities
+    PAGE % (
+        u"x&lt;y &amp; &quot;z&quot;",
+        u"0",
+        u"1",
+        revision(u"1001", text(u"==English==\n* {{IPA|/t&#603;st/|lang=en}} &amp;amp; &lt;b&gt;&apos;&#x263A;&#233;&gt;"))
+    ),
+    # CR/LF line endings, normalized by XML parsers
+    PAGE % (
+        u"crlf",
+        u"0",
+        u"2",
+        revision(u"1002", text(u"==English==\r\n\r\n===Pronunciation===\r\n* {{IPA|/kr/|lang=en}}\r\n"))
+    ),
+    # escaped CR
+    PAGE % (
+        u"cr",
+        u"0",
+        u"3",
+        revision(u"1003", text(u"line&#13;\nnext"))
+    ),
+    # self-closing text
+    PAGE % (
+        u"empty",
+        u"1",
+        u"4",
+        revision(u"1004", u"<text xml:space=\"preserve\" bytes=\"0\" />")
+    ),
+    # several revisions, the last one is used
+    PAGE % (
+        u"revisions",
+        u"0",
+        u"5",
+        revision(u"1005", text(u"old")) + revision(u"1006", text(u"==English==\nnew &amp; newer"))
+    ),
+    # non-ASCII title and text
+    PAGE % (
+        u"café",
+        u"0",
+        u"6",
+        revision(u"1007", text(u"==Italian==\n* {{IPA|/kaˈfɛ/|lang=it}}"))
+    ),
+    # a page much longer than the blocks
+    PAGE % (
+        u"long",
+        u"0",
+        u"7",
+        revision(u"1008", text(u"==English==\n" + u"lorem ipsum &amp; " * 2000))
+    ),
+    PAGE % (
+        u"Talk:last",
+        u"1",
+        u"8",
+        revision(u"1009", text(u"talk"))
+    ),
+]
+
+DUMP = HEADER + u"".join(PAGES) + FOOTER
+
+class TestParserEngines(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_directory = tempfile.mkdtemp()
+        self.dump_file_path = os.path.join(self.tmp_directory, u"dump.xml")
+        with io.open(self.dump_file_path, "w", encoding="utf-8", newline="") as dump_file:
+            dump_file.write(DUMP)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_directory)
+
+    def fields(self, pages):
+        return [(
+            p.title,
+            p.id,
+            p.ns,
+            p.revision_id,
+            p.revision_timestamp,
+            p.revision_sha1,
+            p.revision_text
+        ) for p in pages]
+
+    def lxml_fields(self, full_parsing=False):
+        parser = Parser(full_parsing=full_parsing, engine=u"lxml")
+        return self.fields(parser.iter_pages(self.dump_file_path))
+
+    def fast_fields(self, block_size=None, full_parsing=False):
+        parser = Parser(full_parsing=full_parsing, engine=u"fast")
+        if block_size is not None:
+            parser.BLOCK_SIZE = block_size
+        return self.fields(parser.iter_pages(self.dump_file_path))
+
+    def test_lxml(self):
+        fields = self.lxml_fields()
+        self.assertEqual(len(fields), len(PAGES))
+        self.assertEqual(fields[0][0], u"x<y & \"z\"")
+        self.assertEqual(fields[1][6], u"==English==\n\n===Pronunciation===\n* {{IPA|/kr/|lang=en}}\n")
+        self.assertEqual(fields[3][6], u"")
+        self.assertEqual(fields[4][3], u"1006")
+
+    def test_fast_equals_lxml(self):
+        self.assertEqual(self.fast_fields(), self.lxml_fields())
+
+    def test_fast_equals_lxml_full_parsing(self):
+        self.assertEqual(self.fast_fields(full_parsing=True), self.lxml_fields(full_parsing=True))
+
+    def test_fast_equals_lxml_block_boundaries(self):
+        expected = self.lxml_fields()
+        for block_size in [1, 5, 7, 64, 1000, 4096]:
+            self.assertEqual(self.fast_fields(block_size=block_size), expected)
+
+    def test_parse_string(self):
+        fast = Parser(engine=u"fast").parse_string(DUMP).pages
+        lxml = Parser(engine=u"lxml").parse_string(DUMP).pages
+        self.assertEqual(self.fields(fast), self.fields(lxml))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
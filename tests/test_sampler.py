@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Tests for wiktts.mw.splitter.sampler.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wiktts.mw.splitter.sampler import OTHER_STRATUM
+from wiktts.mw.splitter.sampler import ReservoirSampler
+from wiktts.mw.splitter.sampler import allocate
+from wiktts.mw.splitter.splitter import Splitter
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+PAGE_WITH_NS = u"""  <page>
+    <title>word%d</title>
+    <ns>0</ns>
+    <id>%d</id>
+    <revision>
+      <id>%d</id>
+      <sha1>sha%d</sha1>
+      <text xml:space="preserve">==English==</text>
+    </revision>
+  </page>
+"""
+
+PAGE_WITHOUT_NS = u"""  <page>
+    <title>word%d</title>
+    <id>%d</id>
+    <revision>
+      <id>%d</id>
+      <sha1>sha%d</sha1>
+      <text xml:space="preserve">==English==</text>
+    </revision>
+  </page>
+"""
+
+class TestAllocate(unittest.TestCase):
+
+    def test_allocate_proportional(self):
+        self.assertEqual(allocate(4, {0: 6, 1: 2}), {0: 3, 1: 1})
+
+    def test_allocate_small_population(self):
+        self.assertEqual(allocate(10, {0: 6, 1: 2}), {0: 6, 1: 2})
+
+    def test_allocate_none_stratum(self):
+        quotas = allocate(2, {None: 3, 0: 5})
+        self.assertEqual(sum(quotas.values()), 2)
+        self.assertEqual(quotas, {None: 1, 0: 1})
+
+    def test_allocate_mixed_strata(self):
+        quotas = allocate(3, {None: 1, 0: 1, 10: 1, OTHER_STRATUM: 1})
+        self.assertEqual(quotas, {0: 1, 10: 1, None: 1, OTHER_STRATUM: 0})
+
+
+class TestReservoirSampler(unittest.TestCase):
+
+    def test_sample_size(self):
+        sampler = ReservoirSampler(10, seed=0)
+        for i in range(100):
+            sampler.add(i)
+        sample = sampler.sample
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(sample, sorted(sample))
+
+    def test_sample_reproducible(self):
+        samples = []
+        for j in range(2):
+            sampler = ReservoirSampler(10, seed=42)
+            for i in range(100):
+                sampler.add(i, stratum=i % 3)
+            samples.append(sampler.sample)
+        self.assertEqual(samples[0], samples[1])
+
+    def test_max_strata(self):
+        sampler = ReservoirSampler(5, seed=0, max_strata=2)
+        for i in range(100):
+            sampler.add(i, stratum=i % 10)
+        self.assertEqual(set(sampler.reservoirs), set([0, 1, OTHER_STRATUM]))
+        self.assertEqual(sampler.counts[OTHER_STRATUM], 80)
+        self.assertEqual(len(sampler.sample), 5)
+
+    def test_invalid_max_strata(self):
+        with self.assertRaises(ValueError):
+            ReservoirSampler(5, max_strata=0)
+
+
+class TestSplitterSample(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_directory = tempfile.mkdtemp()
+        self.dump_file_path = os.path.join(self.tmp_directory, u"dump.xml")
+        pages = []
+        for i in range(1, 21):
+            template = PAGE_WITH_NS if i % 2 == 0 else PAGE_WITHOUT_NS
+            pages.append(template % (i, i, i, i))
+        with io.open(self.dump_file_path, "w", encoding="utf-8") as dump_file:
+            dump_file.write(u"<mediawiki>\n%s</mediawiki>\n" % u"".join(pages))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_directory)
+
+    def test_sample_by_ns_with_missing_ns(self):
+        splitter = Splitter(
+            dump_file_path=self.dump_file_path,
+            pages_per_chunk=10,
+            sample_size=4,
+            sample_strata=u"ns"
+        )
+        output_file = io.BytesIO()
+        pages_total, pages_sampled = splitter.write_ndjson(output_file)
+        self.assertEqual(pages_total, 20)
+        self.assertEqual(pages_sampled, 4)
+        records = [json.loads(line.decode("utf-8")) for line in output_file.getvalue().splitlines()]
+        self.assertEqual(len([r for r in records if r[u"ns"] is None]), 2)
+        self.assertEqual(len([r for r in records if r[u"ns"] == 0]), 2)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
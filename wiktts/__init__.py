@@ -18,8 +18,44 @@ __version__ = "0.1.0"
 __status__ = "Development"
 
 def write_file(formatted_data, output_file_path):
-    with io.open(output_file_path, "w", encoding="utf-8") as output_file:
-        output_file.write(u"\n".join(formatted_data))
+    # NOTE formatted_data can be any iterable, e.g. an ExternalSorter,
+    #      and it is written line by line, instead of being joined in memory
+    with LineWriter(output_file_path) as writer:
+        writer.write(formatted_data)
+
+class LineWriter(object):
+    """
+    Write lines to the given file incrementally,
+    separated by a newline, without a trailing newline,
+    without holding all the lines in memory::
+
+        with LineWriter(output_file_path) as writer:
+            for lines in chunks:
+                writer.write(lines)
+    """
+
+    def __init__(self, output_file_path):
+        self.output_file = io.open(output_file_path, "w", encoding="utf-8")
+        self.lines_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.output_file.close()
+
+    def write(self, lines):
+        """
+        Write the given lines (an iterable of Unicode strings).
+        """
+        for line in lines:
+            if self.lines_written > 0:
+                self.output_file.write(u"\n")
+            self.output_file.write(line)
+            self.lines_written += 1
 
 
 
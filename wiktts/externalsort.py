@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Sort a sequence of Unicode strings (e.g., the lines of a lexicon)
+which might not fit in memory (external merge sort).
+
+The strings are accumulated in memory until they exceed
+the given memory budget; then they are sorted,
+and written (spilled) to a temporary file as a sorted run.
+Iterating over the sorter merges the sorted runs
+(and the strings still in memory) with a heap.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import heapq
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# default memory budget, in MB
+DEFAULT_MEMORY_BUDGET = 256
+
+def _escape(string):
+    # NOTE the runs are newline separated
+    if (u"\\" in string) or (u"\n" in string):
+        return string.replace(u"\\", u"\\\\").replace(u"\n", u"\\n")
+    return string
+
+def _unescape(string):
+    if u"\\" not in string:
+        return string
+    acc = []
+    i = 0
+    while i < len(string):
+        c = string[i]
+        if (c == u"\\") and (i + 1 < len(string)):
+            i += 1
+            c = u"\n" if string[i] == u"n" else string[i]
+        acc.append(c)
+        i += 1
+    return u"".join(acc)
+
+def _read_run(run_file_path):
+    """
+    A generator yielding the strings of the given sorted run, in order.
+    """
+    with io.open(run_file_path, "rb") as run_file:
+        for line in run_file:
+            yield _unescape(line[:-1].decode("utf-8"))
+
+def _write_run(strings, run_file_path):
+    """
+    Write the given (already sorted) strings to the given run file.
+    """
+    with io.open(run_file_path, "wb") as run_file:
+        for string in strings:
+            run_file.write(_escape(string).encode("utf-8") + b"\n")
+
+
+
+class ExternalSorter(object):
+    """
+    Sort Unicode strings using at most (approximately)
+    memory_budget MB of memory, spilling sorted runs
+    to temporary files inside temp_directory
+    (default: the system temporary directory)::
+
+        with ExternalSorter(memory_budget=256) as sorter:
+            sorter.extend(strings)
+            for string in sorter:
+                ...
+
+    The sorter can be iterated more than once,
+    and the strings can be added between two iterations.
+    The temporary files are removed when the sorter is closed.
+    """
+
+    # merge the runs into a single run when they reach this number,
+    # to bound the number of open files
+    MAX_RUNS = 256
+
+    def __init__(self, memory_budget=None, temp_directory=None):
+        if memory_budget is None:
+            memory_budget = DEFAULT_MEMORY_BUDGET
+        if memory_budget <= 0:
+            raise ValueError(u"The memory budget must be positive. (Got '%s')" % memory_budget)
+        self.memory_budget = memory_budget
+        self.temp_directory = temp_directory
+        self.run_directory = None
+        self.run_counter = 0
+        self.runs = []
+        self.buffer = []
+        self.buffer_size = 0
+        self.length = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        return self.length
+
+    def close(self):
+        """
+        Remove the temporary files, if any, and empty the sorter.
+        """
+        if self.run_directory is not None:
+            shutil.rmtree(self.run_directory, ignore_errors=True)
+            self.run_directory = None
+        self.runs = []
+        self.buffer = []
+        self.buffer_size = 0
+        self.length = 0
+
+    def add(self, string):
+        """
+        Add the given Unicode string.
+        """
+        self.buffer.append(string)
+        # NOTE the size of the string object plus the list slot
+        self.buffer_size += sys.getsizeof(string) + 8
+        self.length += 1
+        if self.buffer_size >= self.memory_budget * 1024 * 1024:
+            self._spill()
+
+    def extend(self, strings):
+        """
+        Add the given Unicode strings.
+        """
+        for string in strings:
+            self.add(string)
+
+    def _new_run_file_path(self):
+        if self.run_directory is None:
+            self.run_directory = tempfile.mkdtemp(prefix=u"wiktts.", dir=self.temp_directory)
+        self.run_counter += 1
+        return os.path.join(self.run_directory, u"run.%06d" % self.run_counter)
+
+    def _spill(self):
+        """
+        Sort the strings in memory, and write them as a new run.
+        """
+        self.buffer.sort()
+        run_file_path = self._new_run_file_path()
+        _write_run(self.buffer, run_file_path)
+        self.runs.append(run_file_path)
+        self.buffer = []
+        self.buffer_size = 0
+        if len(self.runs) >= self.MAX_RUNS:
+            # merge all the runs into a single run
+            merged_file_path = self._new_run_file_path()
+            _write_run(heapq.merge(*[_read_run(r) for r in self.runs]), merged_file_path)
+            for run_file_path in self.runs:
+                os.remove(run_file_path)
+            self.runs = [merged_file_path]
+
+    def __iter__(self):
+        self.buffer.sort()
+        if len(self.runs) == 0:
+            return iter(self.buffer)
+        return heapq.merge(self.buffer, *[_read_run(r) for r in self.runs])
+
+
+
+def external_sort(strings, memory_budget=None, temp_directory=None):
+    """
+    Return an ExternalSorter holding the given Unicode strings,
+    which yields them in sorted order when iterated,
+    and which the caller must close to remove its temporary files.
+    """
+    sorter = ExternalSorter(memory_budget=memory_budget, temp_directory=temp_directory)
+    try:
+        sorter.extend(strings)
+    except:
+        sorter.close()
+        raise
+    return sorter
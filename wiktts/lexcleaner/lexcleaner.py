@@ -13,6 +13,7 @@ from ipapy.ipastring import IPAString
 from wiktts import write_file
 from wiktts.cleanedpronunciationlexicon import CleanedPronunciationLexicon
 from wiktts.commandlinetool import CommandLineTool
+from wiktts.externalsort import DEFAULT_MEMORY_BUDGET
 from wiktts.lexcleaner.pronunciationcleaner import PronunciationCleaner
 from wiktts.lexcleaner.unicodecleaner import UnicodeCleaner
 
@@ -121,6 +122,13 @@ class LexCleaner(CommandLineTool):
             "action": "store_true",
             "help": "Do not sort the results"
         },
+        {
+            "name": "--sort-memory",
+            "nargs": "?",
+            "type": int,
+            "default": DEFAULT_MEMORY_BUDGET,
+            "help": "Sort the results using at most this memory (in MB), spilling sorted runs to temporary files (default: %d)" % DEFAULT_MEMORY_BUDGET
+        },
         {
             "name": "--stats",
             "action": "store_true",
@@ -182,6 +190,7 @@ class LexCleaner(CommandLineTool):
         comment_invalid = self.vargs["comment_invalid"]
         template = self.vargs["format"]
         sort = not self.vargs["no_sort"]
+        sort_memory = self.vargs["sort_memory"]
         select_all = self.vargs["all"]
         select_invalid = self.vargs["invalid"]
        
@@ -197,6 +206,8 @@ class LexCleaner(CommandLineTool):
             self.error(u"The word cleaner source file must exist. (Got '%s')" % word_cleaner_path)
         if (pron_cleaner_path is not None) and (not os.path.isfile(pron_cleaner_path)):
             self.error(u"The pronunciation cleaner source file must exist. (Got '%s')" % pron_cleaner_path)
+        if sort_memory < 1:
+            self.error(u"The sort memory must be at least 1 MB. (Got '%d')" % sort_memory)
         base = os.path.basename(lexicon_file_path)
         
         # load lexicon
@@ -224,12 +235,23 @@ class LexCleaner(CommandLineTool):
             template=template,
             comment_invalid=comment_invalid,
             comment=comment,
-            sort=sort
+            sort=sort,
+            sort_memory=sort_memory
         )
 
         # output as requested
         created_files.append(os.path.join(self.output_directory_path, base + u".clean"))
-        write_file(formatted_data, created_files[-1]) 
+        try:
+            write_file(formatted_data, created_files[-1]) 
+
+            # print to stdout if requested 
+            if print_stdout:
+                for d in formatted_data:
+                    self.print_stdout(d)
+        finally:
+            if sort:
+                # remove the temporary files of the ExternalSorter, if any
+                formatted_data.close()
 
         created_files.append(os.path.join(self.output_directory_path, base + u".letters"))
         write_file(self.lexicon.format_letters(), created_files[-1])
@@ -251,11 +273,6 @@ class LexCleaner(CommandLineTool):
         created_files.append(os.path.join(self.output_directory_path, base + u".cleaner_stats"))
         write_file(stats, created_files[-1])
 
-        # print to stdout if requested 
-        if print_stdout:
-            for d in formatted_data:
-                self.print_stdout(d)
-
         # print statistics if requested
         for f in created_files:
             self.print_stderr("Created file: %s" % f)
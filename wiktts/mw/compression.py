@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Compress and decompress XML files (MediaWiki dumps and chunks),
+choosing the compression format from the file name suffix.
+
+Big dump files can be decompressed by an external (parallel) decompressor,
+like ``lbzip2`` or ``pbzip2``, piping its output,
+falling back to the in-process Python module if none is installed.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import bz2
+import gzip
+import io
+import subprocess
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    # python 2 has no lzma module
+    lzma = None
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+COMPRESSIONS = [u"gz", u"bz2", u"xz"]
+
+XML_SUFFIXES = [u".xml"] + [u".xml." + c for c in COMPRESSIONS]
+
+# auto:     use an external decompressor if installed, otherwise the Python module
+# external: use an external decompressor (error if none is installed)
+# python:   use the Python module
+DECOMPRESSOR_BACKENDS = [u"auto", u"external", u"python"]
+
+# external decompressors writing to stdout, in order of preference
+EXTERNAL_DECOMPRESSORS = {
+    u"bz2": [
+        [u"lbzip2", u"-d", u"-c"],
+        [u"pbzip2", u"-d", u"-c"],
+    ],
+    u"gz": [
+        [u"pigz", u"-d", u"-c"],
+    ],
+    u"xz": [
+        [u"xz", u"-d", u"-c", u"-T0"],
+    ],
+}
+
+def find_executable(name):
+    """
+    Return the full path of the given executable, or None if not found.
+    """
+    try:
+        # python 3
+        from shutil import which
+    except ImportError:
+        # python 2
+        from distutils.spawn import find_executable as which
+    return which(name)
+
+def _check_compression(compression):
+    if compression not in COMPRESSIONS:
+        raise ValueError(u"The compression must be one of %s. (Got '%s')" % (COMPRESSIONS, compression))
+    if (compression == u"xz") and (lzma is None):
+        raise ValueError(u"The xz compression requires the lzma module")
+
+def compression_of(file_path):
+    """
+    Return the compression of the given file path,
+    guessed from its suffix, or None if uncompressed.
+    """
+    for compression in COMPRESSIONS:
+        if file_path.endswith(u"." + compression):
+            return compression
+    return None
+
+def is_xml_file(file_path):
+    """
+    Return True if the given file path ends in
+    ``.xml``, possibly followed by a compression suffix.
+    """
+    return any(file_path.endswith(suffix) for suffix in XML_SUFFIXES)
+
+def compress(data, compression=None):
+    """
+    Compress the given byte string,
+    returning the contents of a file with the given compression.
+    """
+    if compression is None:
+        return data
+    _check_compression(compression)
+    if compression == u"gz":
+        # NOTE gzip.compress is not available in python 2
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    if compression == u"bz2":
+        return bz2.compress(data)
+    return lzma.compress(data)
+
+def open_file(file_path):
+    """
+    Open the given file for reading in binary mode,
+    decompressing it according to its suffix.
+    """
+    compression = compression_of(file_path)
+    if compression is None:
+        return io.open(file_path, "rb")
+    _check_compression(compression)
+    if compression == u"gz":
+        return gzip.GzipFile(file_path, "rb")
+    if compression == u"bz2":
+        return bz2.BZ2File(file_path, "r")
+    return lzma.LZMAFile(file_path, "rb")
+
+def find_external_decompressor(compression):
+    """
+    Return the command line (list) of the first external decompressor
+    installed for the given compression, or None if none is installed.
+    """
+    for command in EXTERNAL_DECOMPRESSORS.get(compression, []):
+        executable = find_executable(command[0])
+        if executable is not None:
+            return [executable] + command[1:]
+    return None
+
+def open_dump(file_path, backend=u"auto"):
+    """
+    Open the given (possibly compressed) dump file for reading in binary mode,
+    using the given decompressor backend.
+
+    Return a tuple (file_obj, description),
+    where description says which decompressor is used.
+    """
+    if backend not in DECOMPRESSOR_BACKENDS:
+        raise ValueError(u"The decompressor backend must be one of %s. (Got '%s')" % (DECOMPRESSOR_BACKENDS, backend))
+    compression = compression_of(file_path)
+    if compression is None:
+        return (io.open(file_path, "rb"), u"none (uncompressed)")
+    if backend != u"python":
+        command = find_external_decompressor(compression)
+        if command is not None:
+            return (ExternalDecompressor(command, file_path), u"%s (external)" % command[0])
+        if backend == u"external":
+            raise ValueError(u"No external decompressor installed for '%s'. (Tried: %s)" % (
+                compression,
+                u", ".join([c[0] for c in EXTERNAL_DECOMPRESSORS.get(compression, [])])
+            ))
+    return (open_file(file_path), u"%s Python module (in-process)" % (u"lzma" if compression == u"xz" else compression))
+
+
+
+class ExternalDecompressor(object):
+    """
+    A read-only, forward-only file-like object
+    reading the standard output of an external decompressor.
+    """
+
+    def __init__(self, command, file_path):
+        self.command = command
+        self.file_path = file_path
+        self.position = 0
+        self.process = subprocess.Popen(
+            command + [file_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=-1
+        )
+        self.process.stdin.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read(self, size=-1):
+        data = self.process.stdout.read(size)
+        self.position += len(data)
+        if (len(data) == 0) and (size != 0):
+            # end of stream: check that the decompressor succeeded
+            if self.process.wait() != 0:
+                raise IOError(u"The external decompressor failed. (Got '%s' exit code %d)" % (u" ".join(self.command), self.process.returncode))
+        return data
+
+    def seek(self, offset):
+        """
+        Skip forward to the given offset, discarding the data before it.
+        """
+        if offset < self.position:
+            raise IOError(u"Cannot seek backward in the output of an external decompressor")
+        while self.position < offset:
+            if len(self.read(min(offset - self.position, 1024 * 1024))) == 0:
+                break
+        return self.position
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
@@ -99,5 +99,33 @@ def format_mwdata(data, template=None, dump_file_path=None, include=(True, False
         FILEPATH=absolute_path
     ) for d in filtered_data]
 
+def read_mwdata(file_path):
+    """
+    A generator yielding a Data object for each line of the given file,
+    formatted with DEFAULT_FORMAT_ANY, that is, the inverse of format_mwdata
+    with include=(True, True, True, True) and no template
+    (i.e., the .lex file written by the miner with --all).
+
+    Raise ValueError if a line does not have that format.
+    """
+    booleans = {u"True": True, u"False": False}
+    with io.open(file_path, "r", encoding="utf-8") as input_file:
+        for index, line in enumerate(input_file, 1):
+            line = line.rstrip(u"\n")
+            if len(line) < 1:
+                continue
+            fields = line.split(u"\t", 4)
+            if (len(fields) != 5) or (fields[0] not in booleans) or (fields[1] not in booleans):
+                raise ValueError(u"Line %d of '%s' is not formatted as '%s'" % (index, file_path, DEFAULT_FORMAT_ANY))
+            haslanguageblock, extracted, page_id, word, ipa = fields
+            extracted = booleans[extracted]
+            yield Data(
+                booleans[haslanguageblock],
+                extracted,
+                page_id,
+                word,
+                ipa if extracted else None
+            )
+
 
 
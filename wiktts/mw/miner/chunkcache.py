@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+An on-disk cache of the extraction results (ExtractionInfo) of chunks,
+so that re-mining a dump (directory) after changing one IPA parser
+does not parse again the chunks already mined with the other parsers,
+or with the same version of the same parser.
+
+A result is stored as a gzip compressed JSON file,
+named after the SHA1 of its key, computed from:
+
+1. the SHA1 of the contents of the chunk (file),
+2. the hash of the source code of the IPA parser (see IPAExtractor),
+3. the namespaces being extracted.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import gzip
+import hashlib
+import io
+import json
+import os
+
+from wiktts.mw.data import Data
+from wiktts.mw.data import ExtractionInfo
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# bump if the format of the cached files changes
+CACHE_VERSION = u"1"
+
+def file_sha1(file_path, block_size=1024 * 1024):
+    """
+    Return the SHA1 (hex string) of the contents of the given file.
+    """
+    digest = hashlib.sha1()
+    with io.open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def bytes_sha1(contents):
+    """
+    Return the SHA1 (hex string) of the given byte string.
+    """
+    return hashlib.sha1(contents).hexdigest()
+
+
+
+class ChunkCache(object):
+    """
+    A cache of ExtractionInfo objects, stored inside the given directory,
+    for the IPA parser with the given source hash
+    and the given namespaces::
+
+        cache = ChunkCache(cache_directory, parser_hash, namespaces)
+        key = cache.key(file_sha1(chunk_file_path))
+        chunk_info = cache.get(key)
+        if chunk_info is None:
+            chunk_info = ...
+            cache.put(key, chunk_info)
+    """
+
+    def __init__(self, cache_directory, parser_hash, namespaces=None):
+        if not os.path.isdir(cache_directory):
+            raise ValueError(u"The cache directory must exist. (Got '%s')" % cache_directory)
+        self.cache_directory = cache_directory
+        self.parser_hash = parser_hash
+        self.namespaces = sorted(namespaces or [])
+
+    def key(self, contents_sha1):
+        """
+        Return the key (hex string) of the chunk
+        whose contents has the given SHA1.
+        """
+        key = u"%s\n%s\n%s\n%s" % (CACHE_VERSION, contents_sha1, self.parser_hash, self.namespaces)
+        return bytes_sha1(key.encode("utf-8"))
+
+    def _path(self, key):
+        return os.path.join(self.cache_directory, key + u".json.gz")
+
+    def get(self, key):
+        """
+        Return the ExtractionInfo stored with the given key,
+        or None if not found (or unreadable).
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with gzip.open(path, "rb") as f:
+                record = json.loads(f.read().decode("utf-8"))
+            return ExtractionInfo(
+                mwdata=[Data(*d) for d in record["mwdata"]],
+                pages_total=record["pages_total"],
+                pages_with_language_block=record["pages_with_language_block"],
+                pages_with_ipa=record["pages_with_ipa"]
+            )
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            # NOTE treat a corrupted file as a miss, it will be overwritten
+            return None
+
+    def put(self, key, chunk_info):
+        """
+        Store the given ExtractionInfo with the given key.
+        """
+        record = {
+            u"mwdata": [list(d) for d in chunk_info.mwdata],
+            u"pages_total": chunk_info.pages_total,
+            u"pages_with_language_block": chunk_info.pages_with_language_block,
+            u"pages_with_ipa": chunk_info.pages_with_ipa,
+        }
+        path = self._path(key)
+        # NOTE write to a temporary file, then rename it,
+        #      so that concurrent miners never read a partial file
+        tmp_path = u"%s.%d.tmp" % (path, os.getpid())
+        contents = json.dumps(record, ensure_ascii=False, sort_keys=True)
+        if not isinstance(contents, bytes):
+            contents = contents.encode("utf-8")
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(contents)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # e.g., on Windows, if path has been created by another miner
+            os.remove(tmp_path)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A persistent store (SQLite database) of the results of the IPA parsers,
+mapping the (IPA parser source hash, revision text SHA1) pair
+to the extracted (has_lang, ipa) tuple.
+
+Since the results of an IPA parser depend only on the revision text,
+and most pages do not change between two dump releases,
+re-mining a new dump needs to run the IPA parser
+only on the pages whose text changed (or on all the pages,
+if the IPA parser changed).
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import sqlite3
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+class ExtractionStore(object):
+    """
+    The store in the SQLite database at the given path
+    (created if it does not exist),
+    for the IPA parser with the given source hash::
+
+        store = ExtractionStore(store_path, parser_hash)
+        result = store.get(page.revision_sha1)
+        if result is None:
+            result = ipa_parser.extract_ipa_string(page.revision_text)
+            store.put(page.revision_sha1, result)
+        store.commit()
+
+    Several processes can share the same database,
+    since SQLite serializes the writes.
+    The database is opened when first accessed,
+    that is, by the (worker) process actually using it.
+    """
+
+    # seconds to wait for the database lock held by another process
+    TIMEOUT = 600
+
+    def __init__(self, store_path, parser_hash):
+        self.store_path = store_path
+        self.parser_hash = parser_hash
+        self.pending = []
+        self.__connection = None
+
+    @property
+    def connection(self):
+        if self.__connection is None:
+            # NOTE the store might be created by a thread and used by another one,
+            #      but never by two threads at the same time
+            self.__connection = sqlite3.connect(self.store_path, timeout=self.TIMEOUT, check_same_thread=False)
+            self.__connection.execute(
+                u"CREATE TABLE IF NOT EXISTS extractions ("
+                u"parser_hash TEXT NOT NULL, "
+                u"sha1 TEXT NOT NULL, "
+                u"has_lang INTEGER NOT NULL, "
+                u"ipa TEXT, "
+                u"PRIMARY KEY (parser_hash, sha1))"
+            )
+            self.__connection.commit()
+        return self.__connection
+
+    def close(self):
+        if self.__connection is not None:
+            self.commit()
+            self.__connection.close()
+            self.__connection = None
+
+    def get(self, sha1):
+        """
+        Return the (has_lang, ipa) tuple stored for the given text SHA1,
+        or None if not found.
+        """
+        row = self.connection.execute(
+            u"SELECT has_lang, ipa FROM extractions WHERE parser_hash = ? AND sha1 = ?",
+            (self.parser_hash, sha1)
+        ).fetchone()
+        if row is None:
+            return None
+        return (bool(row[0]), row[1])
+
+    def put(self, sha1, result):
+        """
+        Store the given (has_lang, ipa) tuple for the given text SHA1.
+        The results are written to the database by commit().
+        """
+        has_lang, ipa = result
+        self.pending.append((self.parser_hash, sha1, 1 if has_lang else 0, ipa))
+
+    def commit(self):
+        """
+        Write the results stored by put() since the last commit.
+        """
+        if len(self.pending) > 0:
+            self.connection.executemany(
+                u"INSERT OR REPLACE INTO extractions (parser_hash, sha1, has_lang, ipa) VALUES (?, ?, ?, ?)",
+                self.pending
+            )
+            self.connection.commit()
+            self.pending = []
@@ -3,17 +3,23 @@
 
 """
 Load an IPA parser dynamically (from file name or file path),
-and use it to extract IPA strings from a file, a list of Page objects, or a string.
+and use it to extract IPA strings from a file, an iterable of Page objects, or a string.
+
+Several IPA parsers can extract IPA strings from the same pages
+in a single pass (see multi_extract_from_pages).
 """
 
 from __future__ import absolute_import
 from __future__ import division 
 from __future__ import print_function
+import hashlib
 import imp
+import io
 import os
 
 from wiktts.mw.data import Data
 from wiktts.mw.data import ExtractionInfo
+from wiktts.mw.miner.extractionstore import ExtractionStore
 from wiktts.mw.parser import Parser
 
 __author__ = "Alberto Pettarin"
@@ -25,47 +31,135 @@ class IPAExtractor(object):
     
     PARSERS_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "parsers")
 
-    def __init__(self, ipa_parser_name):
+    def __init__(self, ipa_parser_name, store_path=None):
         try:
             if os.path.isfile(ipa_parser_name):
+                self.ipa_parser_path = ipa_parser_name
                 ipa_parser_code = imp.load_source("", ipa_parser_name)
             else:
                 ipa_parser_full_path = ipa_parser_name
                 if not ipa_parser_full_path.endswith(".py"):
                     ipa_parser_full_path += ".py"
+                self.ipa_parser_path = os.path.join(self.PARSERS_DIRECTORY, ipa_parser_full_path)
                 base_parser = imp.load_source("baseparser", os.path.join(self.PARSERS_DIRECTORY, "baseparser.py"))
-                ipa_parser_code = imp.load_source("", os.path.join(self.PARSERS_DIRECTORY, ipa_parser_full_path))
+                ipa_parser_code = imp.load_source("", self.ipa_parser_path)
         except:
             raise ValueError("Unable to load parser. (Got '%s')" % ipa_parser_name)
         self.ipa_parser = ipa_parser_code.Parser()
+        # NOTE a parser loaded from file might not extend BaseParser
+        self.lb_needle = getattr(self.ipa_parser, "LB_NEEDLE", None)
+        self.from_lines = getattr(self.ipa_parser, "extract_ipa_string_from_lines", None)
+        # the results of the IPA parser, keyed by revision text SHA1, if any
+        self.store = None
+        if store_path is not None:
+            self.store = ExtractionStore(store_path, self.source_hash)
+        self.store_hits = 0
+        self.store_misses = 0
+
+    @property
+    def source_hash(self):
+        """
+        The SHA1 (hex string) of the source code of the IPA parser,
+        of the base parser, and of this module,
+        which changes whenever the extraction results might change.
+        """
+        digest = hashlib.sha1()
+        for path in [
+            self.ipa_parser_path,
+            os.path.join(self.PARSERS_DIRECTORY, "baseparser.py"),
+            os.path.splitext(os.path.abspath(__file__))[0] + ".py"
+        ]:
+            with io.open(path, "rb") as source_file:
+                digest.update(source_file.read())
+        return digest.hexdigest()
 
     def extract_from_file(self, dump_file_path):
-        return self.extract_from_pages(Parser(full_parsing=False).parse_file(dump_file_path).pages)
+        return self.extract_from_pages(Parser(full_parsing=False).iter_pages(dump_file_path))
 
     def extract_from_pages(self, pages):
-        mwdata = []
-        pages_with_language_block = 0
-        pages_with_ipa = 0
-        for p in pages:
-            has_lang, ipa = self.ipa_parser.extract_ipa_string(p.revision_text)
+        """
+        Extract IPA strings from the given pages,
+        either a list or any iterable, e.g. a generator (consumed only once).
+
+        If the IPA parser declares a language block needle,
+        the pages whose text does not contain it are rejected
+        before the IPA parser is run on them.
+
+        If a store is used, the results for the pages
+        whose revision text SHA1 is in the store are read from it,
+        and the IPA parser is run only on the other pages,
+        whose results are then added to the store.
+        """
+        return multi_extract_from_pages([self], pages)[0]
+
+    def extract_from_page(self, page, lines):
+        """
+        Return the (has_lang, ipa) tuple for the given page,
+        where lines is a function returning the lines of its revision text,
+        used instead of the text if the IPA parser extends BaseParser.
+        """
+        if (self.lb_needle is not None) and (not page.text_contains(self.lb_needle)):
+            return (False, None)
+        if (self.store is not None) and (page.revision_sha1 is not None):
+            result = self.store.get(page.revision_sha1)
+            if result is not None:
+                self.store_hits += 1
+                return result
+            result = self._parse(page, lines)
+            self.store.put(page.revision_sha1, result)
+            self.store_misses += 1
+            return result
+        return self._parse(page, lines)
+
+    def _parse(self, page, lines):
+        if self.from_lines is not None:
+            return self.from_lines(lines())
+        return self.ipa_parser.extract_ipa_string(page.revision_text)
+
+    def extract_from_string(self, string):
+        return self.ipa_parser.extract_ipa_string(string)
+
+
+
+def multi_extract_from_pages(ipa_extractors, pages):
+    """
+    Extract IPA strings from the given pages
+    with each of the given IPA extractors,
+    reading each page, and splitting its text into lines, only once.
+
+    Return a list with the ExtractionInfo of each IPA extractor.
+    """
+    def split_lines():
+        if len(lines) == 0:
+            lines.append(p.revision_text.split(u"\n"))
+        return lines[0]
+    accs = [([], [0, 0, 0]) for ipaext in ipa_extractors]
+    for p in pages:
+        # NOTE the lines of the text of p, split by the first parser needing them
+        lines = []
+        for ipaext, (mwdata, counts) in zip(ipa_extractors, accs):
+            counts[0] += 1
+            has_lang, ipa = ipaext.extract_from_page(p, split_lines)
             if not has_lang:
                 mwdata.append(Data(False, False, p.id, p.title, None))
             elif (len(p.title) < 1) or (ipa is None) or (len(ipa) < 1):
                 mwdata.append(Data(True, False, p.id, p.title, None))
-                pages_with_language_block += 1
+                counts[1] += 1
             else:
                 mwdata.append(Data(True, True, p.id, p.title, ipa))
-                pages_with_language_block += 1
-                pages_with_ipa += 1
-        return ExtractionInfo(
+                counts[1] += 1
+                counts[2] += 1
+    for ipaext in ipa_extractors:
+        if ipaext.store is not None:
+            ipaext.store.commit()
+    return [
+        ExtractionInfo(
             mwdata=mwdata,
-            pages_total=len(pages),
-            pages_with_language_block=pages_with_language_block,
-            pages_with_ipa=pages_with_ipa
-        )
-
-    def extract_from_string(self, string):
-        return self.ipa_parser.extract_ipa_string(string)
+            pages_total=counts[0],
+            pages_with_language_block=counts[1],
+            pages_with_ipa=counts[2]
+        ) for mwdata, counts in accs
+    ]
 
 
 
@@ -8,13 +8,30 @@ Extract IPA strings from a given MediaWiki dump file or directory.
 from __future__ import absolute_import
 from __future__ import division 
 from __future__ import print_function
+from collections import OrderedDict
+from collections import deque
+import io
+import multiprocessing
 import os
 
+from wiktts import LineWriter
 from wiktts import write_file
 from wiktts.commandlinetool import CommandLineTool
-from wiktts.mw.data import PLACEHOLDERS, format_mwdata
+from wiktts.externalsort import DEFAULT_MEMORY_BUDGET
+from wiktts.externalsort import ExternalSorter
+from wiktts.mw.compression import DECOMPRESSOR_BACKENDS
+from wiktts.mw.compression import is_xml_file
+from wiktts.mw.ndjson import binary_stdin
+from wiktts.mw.ndjson import read_sized_pages
+from wiktts.mw.data import PLACEHOLDERS, format_mwdata, read_mwdata
+from wiktts.mw.miner.chunkcache import ChunkCache
+from wiktts.mw.miner.chunkcache import bytes_sha1
+from wiktts.mw.miner.chunkcache import file_sha1
 from wiktts.mw.miner.ipaextractor import IPAExtractor
+from wiktts.mw.miner.ipaextractor import multi_extract_from_pages
 from wiktts.mw.miner.minerstatus import MinerStatus
+from wiktts.mw.miner.pipeline import Pipeline
+from wiktts.mw.parser import ENGINES
 from wiktts.mw.parser import Parser
 from wiktts.mw.splitter.splitter import Splitter
 
@@ -23,24 +40,120 @@ __copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
 __license__ = "MIT"
 __email__ = "alberto@albertopettarin.it"
 
+# the IPA extractors (with their stores, if any), the XML parser,
+# and the chunk caches (if any) of the current (worker) process,
+# created once by init_worker, instead of once per chunk
+WORKER = dict()
+
+def init_worker(ipa_parsers, engine, cache_directory=None, namespaces=None, store_path=None):
+    WORKER["ipaexts"] = [IPAExtractor(ipa_parser_name=p, store_path=store_path) for p in ipa_parsers]
+    WORKER["mwp"] = Parser(full_parsing=False, engine=engine)
+    WORKER["caches"] = None
+    if cache_directory is not None:
+        WORKER["caches"] = [ChunkCache(cache_directory, ipaext.source_hash, namespaces) for ipaext in WORKER["ipaexts"]]
+
+def _extract(indices, pages):
+    """
+    Extract IPA strings from the given pages,
+    with the IPA extractors with the given indices,
+    reading the pages only once.
+
+    Return a list with a (chunk_info, counters) tuple for each IPA extractor,
+    where counters has the numbers of store hits and misses,
+    if the IPA extractor has a store.
+    """
+    ipaexts = [WORKER["ipaexts"][i] for i in indices]
+    before = [(ipaext.store_hits, ipaext.store_misses) for ipaext in ipaexts]
+    results = []
+    for ipaext, (store_hits, store_misses), chunk_info in zip(ipaexts, before, multi_extract_from_pages(ipaexts, pages)):
+        counters = dict()
+        if ipaext.store is not None:
+            counters["store_hits"] = ipaext.store_hits - store_hits
+            counters["store_misses"] = ipaext.store_misses - store_misses
+        results.append((chunk_info, counters))
+    return results
+
+def _extract_cached(contents_sha1, pages):
+    """
+    Return a list with a (chunk_info, counters) tuple for each IPA extractor,
+    where chunk_info is read from its chunk cache, if possible,
+    otherwise it is computed from the pages returned by pages()
+    and stored in the cache, and counters is a dict with the applicable
+    counters among cache_hits, cache_misses, store_hits, and store_misses.
+
+    The chunk is read only if at least one IPA extractor misses the cache,
+    and only once, whatever the number of IPA extractors missing it.
+    """
+    caches = WORKER["caches"]
+    indices = list(range(len(WORKER["ipaexts"])))
+    if caches is None:
+        return _extract(indices, pages())
+    sha1 = contents_sha1()
+    keys = [cache.key(sha1) for cache in caches]
+    results = [None for i in indices]
+    for i in indices:
+        chunk_info = caches[i].get(keys[i])
+        if chunk_info is not None:
+            results[i] = (chunk_info, {"cache_hits": 1})
+    missing = [i for i in indices if results[i] is None]
+    if len(missing) > 0:
+        for i, (chunk_info, counters) in zip(missing, _extract(missing, pages())):
+            counters["cache_misses"] = 1
+            caches[i].put(keys[i], chunk_info)
+            results[i] = (chunk_info, counters)
+    return results
+
+def extract_from_chunk(contents):
+    """
+    Extract IPA strings from the given chunk (UTF-8 encoded XML byte string).
+    """
+    def pages():
+        mwp = WORKER["mwp"]
+        mwp.parse_string(contents, append=False)
+        return mwp.pages
+    return _extract_cached(lambda: bytes_sha1(contents), pages)
+
+def extract_from_path(path):
+    """
+    Extract IPA strings from the given (possibly compressed) XML file.
+    """
+    return _extract_cached(lambda: file_sha1(path), lambda: WORKER["mwp"].iter_pages(path))
+
+def extract_from_pages(pages):
+    """
+    Extract IPA strings from the given list of Page objects.
+    """
+    return _extract(list(range(len(WORKER["ipaexts"]))), pages)
+
+
+
 class Miner(CommandLineTool):
 
+    # the stages of the extraction pipeline, see extract_ipa_strings
+    PIPELINE_STAGES = [u"decompress", u"split", u"extract", u"write"]
+
+    # the maximum number of items waiting between two stages
+    QUEUE_SIZE = 8
+
+    # the maximum number of items passed at once to the callback of update_ipa_strings
+    UPDATE_BATCH_SIZE = 10000
+
     AP_PROGRAM = u"wiktts.mw.miner"
     AP_DESCRIPTION = u"Extract IPA strings from a given MediaWiki dump file."
     AP_ARGUMENTS = [
         {
             "name": "ipaparser",
-            "nargs": None,
+            "nargs": "+",
             "type": str,
             "default": None,
-            "help": "IPA parser (built-in name or file path)"
+            "help": "IPA parser (built-in name or file path), or several IPA parsers, extracting IPA strings in a single pass over the dump"
         },
         {
             "name": "dump",
             "nargs": None,
             "type": str,
             "default": None,
-            "help": "MediaWiki dump.xml or dump.xml.bz2 or dump/"
+            "help": "MediaWiki dump.xml or dump.xml.bz2 or dump.xml.gz or dump.xml.xz or dump/ or - (NDJSON pages from standard input)"
         },
         {
             "name": "outputdir",
@@ -53,8 +166,64 @@ class Miner(CommandLineTool):
             "name": "--pages-per-chunk",
             "nargs": "?",
             "type": int,
-            "default": 1000,
-            "help": "Number of pages per output file (default: 1000)"
+            "default": None,
+            "help": "Maximum number of pages per chunk (default: 1000, or no limit with --bytes-per-chunk)"
+        },
+        {
+            "name": "--bytes-per-chunk",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Close a chunk once its pages exceed this number of bytes (default: no limit)"
+        },
+        {
+            "name": "--decompressor",
+            "nargs": "?",
+            "type": str,
+            "default": u"auto",
+            "help": "Decompress the dump with an external decompressor (e.g. lbzip2) or the Python module [%s] (default: 'auto')" % u"|".join(DECOMPRESSOR_BACKENDS)
+        },
+        {
+            "name": "--engine",
+            "nargs": "?",
+            "type": str,
+            "default": u"lxml",
+            "help": "Read the pages with lxml or with a faster scanner of the dump layout [%s] (default: 'lxml')" % u"|".join(ENGINES)
+        },
+        {
+            "name": "--jobs",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Number of processes extracting IPA strings from the chunks, and decompressing a multistream dump (default: 1 for extracting, number of CPUs for decompressing)"
+        },
+        {
+            "name": "--cache-dir",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Cache the extraction results of each chunk in this directory, and reuse them if neither the chunk nor the IPA parser changed (default: no cache)"
+        },
+        {
+            "name": "--store",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Store the extraction results of each page in this SQLite database, keyed by revision text SHA1, and reuse them if neither the text nor the IPA parser changed (default: no store)"
+        },
+        {
+            "name": "--update",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Update this lexicon (created with --all) with the pages in the dump (e.g., an incremental dump), instead of mining the dump from scratch (default: no update)"
+        },
+        {
+            "name": "--deleted-ids",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "With --update, remove the pages whose id is listed in this file, one per line (default: no deletion)"
         },
         {
             "name": "--namespaces",
@@ -83,6 +252,13 @@ class Miner(CommandLineTool):
             "action": "store_true",
             "help": "Do not sort the extraction results"
         },
+        {
+            "name": "--sort-memory",
+            "nargs": "?",
+            "type": int,
+            "default": DEFAULT_MEMORY_BUDGET,
+            "help": "Sort the extraction results using at most this memory (in MB), spilling sorted runs to temporary files (default: %d)" % DEFAULT_MEMORY_BUDGET
+        },
         {
             "name": "--hide-progress",
             "action": "store_true",
@@ -109,31 +285,75 @@ class Miner(CommandLineTool):
 
     def __init__(
             self,
-            ipa_parser=None,
+            ipa_parsers=None,
             dump_path=None,
             output_directory_path=None,
             pages_per_chunk=1000,
-            namespaces=[0]
+            bytes_per_chunk=None,
+            namespaces=[0],
+            decompressor=u"auto",
+            engine=u"lxml",
+            jobs=1,
+            decompression_jobs=None,
+            cache_directory=None,
+            store_path=None,
+            base_lexicon_path=None,
+            deleted_ids_path=None
         ):
         super(Miner, self).__init__()
         self.__dump_path_is_file = None
-        self.ipa_parser = ipa_parser
+        self.ipa_parsers = ipa_parsers
         self.dump_path = dump_path
         self.output_directory_path = output_directory_path
         self.pages_per_chunk = pages_per_chunk
+        self.bytes_per_chunk = bytes_per_chunk
         self.namespaces = namespaces
+        self.decompressor = decompressor
+        self.engine = engine
+        self.jobs = jobs
+        self.decompression_jobs = decompression_jobs
+        self.cache_directory = cache_directory
+        self.store_path = store_path
+        self.base_lexicon_path = base_lexicon_path
+        self.deleted_ids_path = deleted_ids_path
+        self.pipeline = None
+
+    @property
+    def ipa_parsers(self):
+        return self.__ipa_parsers
+    @ipa_parsers.setter
+    def ipa_parsers(self, value):
+        if (value is not None) and (not isinstance(value, (list, tuple))):
+            # a single IPA parser
+            value = [value]
+        if value is not None:
+            names = [self.ipa_parser_name(p) for p in value]
+            if len(set(names)) != len(names):
+                self.error("The IPA parsers must have distinct names. (Got: '%s')" % names)
+        self.__ipa_parsers = value
+
+    @classmethod
+    def ipa_parser_name(cls, ipa_parser):
+        """
+        The name of the given IPA parser (built-in name or file path),
+        e.g. "enwiktionary" for "enwiktionary" or "/path/to/enwiktionary.py".
+        """
+        return os.path.splitext(os.path.basename(ipa_parser))[0]
 
     @property
     def dump_path(self):
         return self.__dump_path
     @dump_path.setter
     def dump_path(self, value):
-        if value is not None:
+        if value == u"-":
+            # read NDJSON pages from standard input
+            self.__dump_path_is_file = False
+        elif value is not None:
             if not (os.path.isfile(value) or os.path.isdir(value)):
                 self.error("The dump file or directory must exist. (Got '%s')" % value)
             if os.path.isfile(value):
-                if not (value.endswith(".xml") or value.endswith(".xml.bz2")):
-                    self.error("The dump file path must end in '.xml' (uncompressed) or '.xml.bz2' (compressed). (Got '%s')" % value)
+                if not is_xml_file(value):
+                    self.error("The dump file path must end in '.xml' (uncompressed) or '.xml.bz2', '.xml.gz', '.xml.xz' (compressed). (Got '%s')" % value)
                 self.__dump_path_is_file = True 
             else:
                 self.__dump_path_is_file = False
@@ -143,6 +363,30 @@ class Miner(CommandLineTool):
     def dump_path_is_file(self):
         return self.__dump_path_is_file
 
+    @property
+    def dump_path_is_stdin(self):
+        return self.dump_path == u"-"
+
+    @property
+    def output_file_name(self):
+        """
+        The base name of the output files.
+        """
+        if self.dump_path_is_stdin:
+            return u"stdin"
+        return os.path.basename(self.dump_path)
+
+    def output_file_path(self, index, extension):
+        """
+        The path of the output file with the given extension
+        for the IPA parser with the given index,
+        whose name is included in the file name if there are several IPA parsers.
+        """
+        name = self.output_file_name
+        if len(self.ipa_parsers) > 1:
+            name += u"." + self.ipa_parser_name(self.ipa_parsers[index])
+        return os.path.join(self.output_directory_path, name + extension)
+
     @property
     def output_directory_path(self):
         return self.__output_directory_path
@@ -158,10 +402,19 @@ class Miner(CommandLineTool):
         return self.__pages_per_chunk
     @pages_per_chunk.setter
     def pages_per_chunk(self, value):
-        if value < 1:
+        if (value is not None) and (value < 1):
             self.error("The number of pages per chunk must at least 1. (Got: '%d')" % value)
         self.__pages_per_chunk = value
 
+    @property
+    def bytes_per_chunk(self):
+        return self.__bytes_per_chunk
+    @bytes_per_chunk.setter
+    def bytes_per_chunk(self, value):
+        if (value is not None) and (value < 1):
+            self.error("The number of bytes per chunk must at least 1. (Got: '%d')" % value)
+        self.__bytes_per_chunk = value
+
     @property
     def namespaces(self):
         return self.__namespaces
@@ -169,45 +422,365 @@ class Miner(CommandLineTool):
     def namespaces(self, value):
         self.__namespaces = set(value)
 
-    def extract_ipa_strings(self, show_progress=False):
+    @property
+    def decompressor(self):
+        return self.__decompressor
+    @decompressor.setter
+    def decompressor(self, value):
+        if value not in DECOMPRESSOR_BACKENDS:
+            self.error("The decompressor must be one of %s. (Got: '%s')" % (DECOMPRESSOR_BACKENDS, value))
+        self.__decompressor = value
+
+    @property
+    def engine(self):
+        return self.__engine
+    @engine.setter
+    def engine(self, value):
+        if value not in ENGINES:
+            self.error("The engine must be one of %s. (Got: '%s')" % (ENGINES, value))
+        self.__engine = value
+
+    @property
+    def jobs(self):
+        return self.__jobs
+    @jobs.setter
+    def jobs(self, value):
+        if (value is None) or (value < 1):
+            self.error("The number of jobs must be at least 1. (Got: '%s')" % value)
+        self.__jobs = value
+
+    @property
+    def decompression_jobs(self):
+        return self.__decompression_jobs
+    @decompression_jobs.setter
+    def decompression_jobs(self, value):
+        if (value is not None) and (value < 1):
+            self.error("The number of decompression jobs must be at least 1. (Got: '%s')" % value)
+        self.__decompression_jobs = value
+
+    @property
+    def cache_directory(self):
+        return self.__cache_directory
+    @cache_directory.setter
+    def cache_directory(self, value):
+        if (value is not None) and (not os.path.isdir(value)):
+            self.error("The cache directory must exist. (Got: '%s')" % value)
+        self.__cache_directory = value
+
+    @property
+    def store_path(self):
+        return self.__store_path
+    @store_path.setter
+    def store_path(self, value):
+        if (value is not None) and (not os.path.isdir(os.path.dirname(os.path.abspath(value)))):
+            self.error("The directory of the store must exist. (Got: '%s')" % value)
+        self.__store_path = value
+
+    @property
+    def base_lexicon_path(self):
+        return self.__base_lexicon_path
+    @base_lexicon_path.setter
+    def base_lexicon_path(self, value):
+        if (value is not None) and (not os.path.isfile(value)):
+            self.error("The lexicon to update must exist. (Got: '%s')" % value)
+        self.__base_lexicon_path = value
+
+    @property
+    def deleted_ids_path(self):
+        return self.__deleted_ids_path
+    @deleted_ids_path.setter
+    def deleted_ids_path(self, value):
+        if (value is not None) and (not os.path.isfile(value)):
+            self.error("The file of deleted page ids must exist. (Got: '%s')" % value)
+        self.__deleted_ids_path = value
+
+    @property
+    def deleted_ids(self):
         """
-        Extract IPA strings from the given dump.
+        The set of the page ids (Unicode strings) listed
+        in the file at deleted_ids_path, if any.
+        """
+        if self.deleted_ids_path is None:
+            return set()
+        with io.open(self.deleted_ids_path, "r", encoding="utf-8") as deleted_ids_file:
+            return set([l.strip() for l in deleted_ids_file if len(l.strip()) > 0])
 
-        Return a MinerStatus object.
+    def _splitter(self):
         """
-        def process_chunk(pages, status):
-            """
-            Process a chunk, that is, a set of pages,
-            updating the status object.
-            """
-            status.update(ipaext.extract_from_pages(pages))
-            if show_progress:
-                self.print_stderr(status.pretty_print(single_line=True))
-        # status object to be returned
-        status = MinerStatus()
-        ipaext = IPAExtractor(ipa_parser_name=self.ipa_parser)
-        mwp = Parser(full_parsing=False)
-        if self.dump_path_is_file:
+        The Splitter reading the chunks of the dump file,
+        decompressing it in its own pipeline stage,
+        and using decompression_jobs processes to decompress a multistream dump
+        (if None, as many as the CPUs).
+        """
+        mws = Splitter(
+            dump_file_path=self.dump_path,
+            pages_per_chunk=self.pages_per_chunk,
+            bytes_per_chunk=self.bytes_per_chunk,
+            namespaces=self.namespaces,
+            jobs=self.decompression_jobs,
+            decompressor=self.decompressor
+        )
+        mws.blocks_wrapper = lambda blocks: self.pipeline.stage(
+            u"decompress",
+            blocks,
+            size=lambda block: len(block[2]) / 1048576,
+            unit=u"MiB"
+        )
+        return mws
+
+    def _accept_ns(self, ns):
+        """
+        Return True if a page with the given namespace (string or None)
+        must be extracted, that is, if no namespace was requested,
+        or if its namespace is one of the requested ones.
+        """
+        if len(self.namespaces) == 0:
+            return True
+        try:
+            return int(ns) in self.namespaces
+        except (TypeError, ValueError):
+            return False
+
+    def _tasks(self, mws=None):
+        """
+        A generator yielding a (function, argument) tuple for each chunk
+        of the dump, in dump order, where function is one of
+        extract_from_chunk, extract_from_path, and extract_from_pages,
+        returning a list of (chunk_info, counters) tuples, one per IPA parser.
+
+        The chunks of a dump file are read by the given Splitter.
+        """
+        if self.dump_path_is_stdin:
+            # read NDJSON pages from standard input, in chunks,
+            # filtering them by namespace, as the Splitter does
+            pages_per_chunk = self.pages_per_chunk
+            if (pages_per_chunk is None) and (self.bytes_per_chunk is None):
+                pages_per_chunk = 1000
+            pages = []
+            num_bytes = 0
+            for size, page in read_sized_pages(binary_stdin()):
+                if not self._accept_ns(page.ns):
+                    continue
+                pages.append(page)
+                num_bytes += size
+                if (
+                    ((pages_per_chunk is not None) and (len(pages) >= pages_per_chunk)) or
+                    ((self.bytes_per_chunk is not None) and (num_bytes >= self.bytes_per_chunk))
+                ):
+                    yield (extract_from_pages, pages)
+                    pages = []
+                    num_bytes = 0
+            if len(pages) > 0:
+                yield (extract_from_pages, pages)
+        elif self.dump_path_is_file:
             # read from dump file, in chunks
-            mws = Splitter(dump_file_path=self.dump_path, pages_per_chunk=self.pages_per_chunk, namespaces=self.namespaces)
             for mwchunk in mws.mwchunks:
-                mwp.parse_string(mwchunk.contents, append=False)
-                process_chunk(mwp.pages, status)
+                yield (extract_from_chunk, mwchunk.contents)
         else:
-            # read all XML files from the dump directory
+            # read all XML files (possibly compressed) from the dump directory
             for root, dirs, files in os.walk(self.dump_path):
-                for f in [f for f in sorted(files) if f.endswith(".xml")]:
-                    mwp.parse_file(os.path.join(root, f), append=False)
-                    process_chunk(mwp.pages, status)
+                for f in [f for f in sorted(files) if is_xml_file(f)]:
+                    yield (extract_from_path, os.path.join(root, f))
+
+    def _map_tasks(self, tasks, pool):
+        """
+        A generator yielding the result of each of the given tasks,
+        in the order of the tasks, computed by the given pool of jobs processes.
+
+        At most 2 * jobs chunks are in flight at any time,
+        so that memory usage stays bounded even if the workers
+        are slower than the splitter.
+        """
+        pending = deque()
+        for func, arg in tasks:
+            pending.append(pool.apply_async(func, (arg,)))
+            if len(pending) >= 2 * self.jobs:
+                yield pending.popleft().get()
+        while len(pending) > 0:
+            yield pending.popleft().get()
+
+    def extract_ipa_strings(self, show_progress=False, chunk_callback=None):
+        """
+        Extract IPA strings from the given dump.
+
+        The extraction runs as a pipeline (see wiktts.mw.miner.pipeline),
+        whose stages decompress the dump (dump file only),
+        split it into chunks, extract the IPA strings from the chunks,
+        and write the results, each stage in its own thread,
+        connected by queues of at most QUEUE_SIZE items.
+        The pipeline statistics are available as self.pipeline.
+
+        If there are several IPA parsers, each page is read,
+        and its text is split into lines, only once,
+        then each IPA parser extracts its IPA string
+        (see wiktts.mw.miner.ipaextractor.multi_extract_from_pages).
+
+        If jobs is greater than 1, the chunks are processed
+        by a pool of worker processes, each with its own IPA extractors,
+        and their results are merged in dump order,
+        hence the output does not depend on the number of jobs.
+
+        If cache_directory is not None, the results of each chunk
+        (of a dump file or directory) are read from the chunk cache,
+        if neither the chunk nor the IPA parser changed since they were stored,
+        otherwise they are stored in it (see wiktts.mw.miner.chunkcache).
+
+        If store_path is not None, the results of each page
+        are read from the given SQLite database, if the SHA1
+        of its revision text and the IPA parser did not change
+        since they were stored, otherwise they are stored in it
+        (see wiktts.mw.miner.extractionstore).
+
+        If chunk_callback is not None, it is called
+        with the list of the ExtractionInfo of each chunk,
+        one per IPA parser, in dump order,
+        e.g. to write the extracted data as it arrives,
+        since the returned statuses hold only the counters.
+
+        Return a list of MinerStatus objects, one per IPA parser.
+        """
+        def write(results):
+            for status, (chunk_info, counters) in zip(statuses, results):
+                status.update(chunk_info, counters=counters)
+            if chunk_callback is not None:
+                chunk_callback([chunk_info for chunk_info, counters in results])
+            if show_progress:
+                self.print_stderr(u"%s   %s" % (
+                    u"   ".join([status.pretty_print(single_line=True) for status in statuses]),
+                    self.pipeline.pretty_print(single_line=True)
+                ))
+        # status objects to be returned
+        statuses = [MinerStatus() for p in self.ipa_parsers]
+        self.pipeline = Pipeline(self.PIPELINE_STAGES, queue_size=self.QUEUE_SIZE)
+        # NOTE load the IPA parsers in this process even if jobs > 1,
+        #      so that an invalid parser raises here,
+        #      and not (repeatedly) in the initializer of each worker
+        worker_args = (self.ipa_parsers, self.engine, self.cache_directory, self.namespaces, self.store_path)
+        init_worker(*worker_args)
+        # NOTE create the pools before starting the pipeline threads,
+        #      that is, the pool of the workers (if jobs > 1)
+        #      and the pool decompressing a multistream dump,
+        #      created when the dump is opened (see Splitter.open)
+        pool = None
+        if self.jobs > 1:
+            pool = multiprocessing.Pool(self.jobs, initializer=init_worker, initargs=worker_args)
+        mws = None
+        try:
+            if (not self.dump_path_is_stdin) and self.dump_path_is_file:
+                mws = self._splitter()
+                mws.dump_file_obj = mws.open()
+                mws.dump_file_obj.__enter__()
+            tasks = self.pipeline.stage(u"split", self._tasks(mws))
+            if pool is not None:
+                results = self._map_tasks(tasks, pool)
+            else:
+                results = (func(arg) for func, arg in tasks)
+            results = self.pipeline.stage(
+                u"extract",
+                results,
+                size=lambda results: results[0][0].pages_total,
+                unit=u"pages"
+            )
+            self.pipeline.sink(u"write", results, write)
+        finally:
+            if (mws is not None) and (mws.dump_file_obj is not None):
+                mws.dump_file_obj.close()
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        return statuses
+
+    def update_ipa_strings(self, show_progress=False, data_callback=None):
+        """
+        Update the lexicon at base_lexicon_path,
+        written with --all and no template (see wiktts.mw.data.read_mwdata),
+        with the pages of the given dump (e.g., an incremental dump),
+        inserting, updating, and deleting pages by page id.
+
+        The IPA strings are extracted only from the pages of the dump,
+        using the last occurrence of the pages occurring more than once,
+        while the data of the other pages is copied from the lexicon.
+        The pages whose id is listed in the file at deleted_ids_path
+        (if not None) are removed.
+
+        The data of the updated lexicon is passed to data_callback,
+        in lists of at most UPDATE_BATCH_SIZE Data objects:
+        first the pages of the lexicon not in the dump, in lexicon order,
+        then the pages of the dump, in dump order.
+        Only the data of the pages of the dump is kept in memory.
+
+        Return a MinerStatus object for the pages of the dump,
+        whose counters include the numbers of pages of the lexicon
+        kept, updated, and deleted, and of pages inserted.
+
+        Raise ValueError if there are several IPA parsers,
+        or if the lexicon does not have the expected format.
+        """
+        def collect(chunk_infos):
+            for d in chunk_infos[0].mwdata:
+                # NOTE move a page occurring again to the end
+                touched.pop(d.id, None)
+                touched[d.id] = d
+        def flush(force=False):
+            if (len(batch) >= self.UPDATE_BATCH_SIZE) or (force and (len(batch) > 0)):
+                if data_callback is not None:
+                    data_callback(list(batch))
+                del batch[:]
+        if len(self.ipa_parsers) != 1:
+            raise ValueError(u"A lexicon can be updated with one IPA parser only. (Got '%d')" % len(self.ipa_parsers))
+        touched = OrderedDict()
+        status = self.extract_ipa_strings(show_progress=show_progress, chunk_callback=collect)[0]
+        deleted_ids = self.deleted_ids
+        counters = dict(update_kept=0, update_updated=0, update_inserted=0, update_deleted=0)
+        updated_ids = set()
+        batch = []
+        for d in read_mwdata(self.base_lexicon_path):
+            if d.id in deleted_ids:
+                counters["update_deleted"] += 1
+            elif d.id in touched:
+                updated_ids.add(d.id)
+                counters["update_updated"] += 1
+            else:
+                batch.append(d)
+                counters["update_kept"] += 1
+                flush()
+        for page_id, d in touched.items():
+            if page_id in deleted_ids:
+                continue
+            batch.append(d)
+            if page_id not in updated_ids:
+                counters["update_inserted"] += 1
+            flush()
+        flush(force=True)
+        status.counters.update(counters)
         return status
 
     def actual_command(self):
         # options to init the object
-        self.ipa_parser = self.vargs["ipaparser"]
+        self.ipa_parsers = self.vargs["ipaparser"]
         self.dump_path = self.vargs["dump"]
         self.output_directory_path = self.vargs["outputdir"]
         self.pages_per_chunk = self.vargs["pages_per_chunk"]
+        self.bytes_per_chunk = self.vargs["bytes_per_chunk"]
+        if (self.pages_per_chunk is None) and (self.bytes_per_chunk is None):
+            self.pages_per_chunk = 1000
         self.namespaces = self.vargs["namespaces"]
+        self.decompressor = self.vargs["decompressor"]
+        self.engine = self.vargs["engine"]
+        # NOTE if --jobs is not given, a multistream dump
+        #      is still decompressed by as many processes as the CPUs
+        self.jobs = 1 if self.vargs["jobs"] is None else self.vargs["jobs"]
+        self.decompression_jobs = self.vargs["jobs"]
+        self.cache_directory = self.vargs["cache_dir"]
+        if (self.cache_directory is not None) and self.dump_path_is_stdin:
+            self.error("The cache cannot be used when reading from standard input")
+        self.store_path = self.vargs["store"]
+        self.base_lexicon_path = self.vargs["update"]
+        self.deleted_ids_path = self.vargs["deleted_ids"]
+        if (self.deleted_ids_path is not None) and (self.base_lexicon_path is None):
+            self.error("The deleted page ids can be used only with --update")
+        if (self.base_lexicon_path is not None) and (len(self.ipa_parsers) > 1):
+            self.error("A lexicon can be updated with one IPA parser only")
 
         # options to filter/format results
         all_pages = self.vargs["all"]
@@ -215,15 +788,15 @@ class Miner(CommandLineTool):
         without_ipa = self.vargs["without_ipa"]
         template = self.vargs["format"]
         sort_results = not self.vargs["no_sort"]
+        sort_memory = self.vargs["sort_memory"]
+        if sort_memory < 1:
+            self.error("The sort memory must be at least 1 MB. (Got: '%d')" % sort_memory)
 
         # options controlling print behavior
         show_progress = not self.vargs["hide_progress"]
         print_stats = self.vargs["stats"] 
         print_stdout = self.vargs["stdout"] 
 
-        # extract IPA strings
-        status = self.extract_ipa_strings(show_progress=show_progress)
-
         # select the data to include in the output
         if all_pages:
             include = (True, True, True, True)
@@ -233,40 +806,101 @@ class Miner(CommandLineTool):
             include = (True, False, False, True)
         else:
             include = (True, False, True, False)
-        # format data
-        formatted_data = format_mwdata(
-            status.mwdata,
-            template=template,
-            dump_file_path=self.dump_path,
-            include=include
-        )
-        # sort if requested
-        if sort_results:
-            formatted_data = sorted(formatted_data)
-        
-        # output files 
-        output_file_path = os.path.join(self.output_directory_path, os.path.basename(self.dump_path) + u".lex")
-        write_file(formatted_data, output_file_path)
-        stats_file_path = os.path.join(self.output_directory_path, os.path.basename(self.dump_path) + u".miner_stats")
-        stats = []
-        stats.append(u"IPA parser:       %s" % self.ipa_parser)
-        stats.append(u"Dump path:        %s" % self.dump_path)
-        stats.append(u"Output directory: %s" % self.output_directory_path)
-        stats.append(u"Pages per chunk:  %d" % self.pages_per_chunk)
-        stats.append(u"Namespaces:       %s" % self.namespaces)
-        stats.append(status.pretty_print(single_line=False))
-        write_file(stats, stats_file_path)
-
-        # print to stdout if requested 
-        if print_stdout:
-            for d in formatted_data:
-                self.print_stdout(d)
-
-        # print statistics if requested
-        self.print_stderr(u"Created file %s" % output_file_path)
-        self.print_stderr(u"Created file %s" % stats_file_path)
-        if print_stats:
-            self.print_stderr(u"\n".join(stats))
+
+        def write_data(index, mwdata):
+            # format the given data
+            formatted_data = format_mwdata(
+                mwdata,
+                template=template,
+                dump_file_path=self.dump_path,
+                include=include
+            )
+            if sort_results:
+                # sorted (spilling to temporary files if needed) and written at the end
+                sorted_data[index].extend(formatted_data)
+            else:
+                output_files[index].write(formatted_data)
+                if print_stdout:
+                    for d in formatted_data:
+                        self.print_stdout(d)
+
+        def write_chunk(chunk_infos):
+            for index, chunk_info in enumerate(chunk_infos):
+                write_data(index, chunk_info.mwdata)
+
+        # extract IPA strings, writing them as they are extracted,
+        # to one output file per IPA parser,
+        # sharing the sort memory among them
+        indices = list(range(len(self.ipa_parsers)))
+        output_file_paths = [self.output_file_path(i, u".lex") for i in indices]
+        if self.base_lexicon_path is not None:
+            # NOTE the lexicon to update might be the output file itself,
+            #      hence write to a temporary file,
+            #      renamed over the output file once the update succeeds
+            writer_file_paths = [path + u".tmp" for path in output_file_paths]
+        else:
+            writer_file_paths = output_file_paths
+        output_files = [LineWriter(path) for path in writer_file_paths]
+        sorted_data = [ExternalSorter(memory_budget=max(sort_memory // len(indices), 1)) for i in indices]
+        completed = False
+        try:
+            if self.base_lexicon_path is not None:
+                try:
+                    statuses = [self.update_ipa_strings(show_progress=show_progress, data_callback=lambda mwdata: write_data(0, mwdata))]
+                except ValueError as exc:
+                    self.error(u"%s" % exc)
+            else:
+                statuses = self.extract_ipa_strings(show_progress=show_progress, chunk_callback=write_chunk)
+            # sort if requested
+            if sort_results:
+                for i in indices:
+                    output_files[i].write(sorted_data[i])
+                    if print_stdout:
+                        for d in sorted_data[i]:
+                            self.print_stdout(d)
+            completed = True
+        finally:
+            for i in indices:
+                output_files[i].close()
+                sorted_data[i].close()
+            if writer_file_paths is not output_file_paths:
+                for tmp_file_path, output_file_path in zip(writer_file_paths, output_file_paths):
+                    if not completed:
+                        os.remove(tmp_file_path)
+                        continue
+                    try:
+                        # python 3
+                        os.replace(tmp_file_path, output_file_path)
+                    except AttributeError:
+                        # python 2 (POSIX rename overwrites the destination)
+                        os.rename(tmp_file_path, output_file_path)
+
+        # output files
+        for i in indices:
+            stats_file_path = self.output_file_path(i, u".miner_stats")
+            stats = []
+            stats.append(u"IPA parser:       %s" % self.ipa_parsers[i])
+            stats.append(u"Dump path:        %s" % self.dump_path)
+            stats.append(u"Output directory: %s" % self.output_directory_path)
+            stats.append(u"Pages per chunk:  %s" % self.pages_per_chunk)
+            stats.append(u"Bytes per chunk:  %s" % self.bytes_per_chunk)
+            stats.append(u"Namespaces:       %s" % self.namespaces)
+            stats.append(u"Jobs:             %s" % self.jobs)
+            stats.append(u"Cache directory:  %s" % self.cache_directory)
+            stats.append(u"Store:            %s" % self.store_path)
+            stats.append(u"Updated lexicon:  %s" % self.base_lexicon_path)
+            stats.append(u"Deleted ids:      %s" % self.deleted_ids_path)
+            if len(indices) > 1:
+                stats.append(u"IPA parsers:      %s" % u", ".join(self.ipa_parsers))
+            stats.append(statuses[i].pretty_print(single_line=False))
+            stats.append(self.pipeline.pretty_print(single_line=False))
+            write_file(stats, stats_file_path)
+
+            # print statistics if requested
+            self.print_stderr(u"Created file %s" % output_file_paths[i])
+            self.print_stderr(u"Created file %s" % stats_file_path)
+            if print_stats:
+                self.print_stderr(u"\n".join(stats))
 
 
 
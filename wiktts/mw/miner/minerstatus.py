@@ -3,6 +3,9 @@
 
 """
 Status of the IPA miner, accumulating statistics about the extraction of IPA strings.
+
+Only the counters are accumulated, while the extracted data
+is written as the chunks are processed (see Miner.extract_ipa_strings).
 """
 
 from __future__ import absolute_import
@@ -17,10 +20,12 @@ __email__ = "alberto@albertopettarin.it"
 class MinerStatus(object):
 
     def __init__(self):
-        self.mwdata = []
         self.pages_total = 0
         self.pages_with_language_block = 0
         self.pages_with_ipa = 0
+        # e.g., cache_hits, cache_misses, store_hits, store_misses,
+        # update_kept, update_updated, update_inserted, update_deleted
+        self.counters = dict()
 
     def _percentage(self, value):
         p = 0.0
@@ -36,8 +41,9 @@ class MinerStatus(object):
     def pages_with_ipa_percentage(self):
         return self._percentage(self.pages_with_ipa)
 
-    def update(self, chunk_info):
-        self.mwdata.extend(chunk_info.mwdata)
+    def update(self, chunk_info, counters=None):
+        for name, value in (counters or dict()).items():
+            self.counters[name] = self.counters.get(name, 0) + value
         self.pages_total += chunk_info.pages_total
         self.pages_with_language_block += chunk_info.pages_with_language_block
         self.pages_with_ipa += chunk_info.pages_with_ipa
@@ -57,6 +63,19 @@ class MinerStatus(object):
             acc.append(u"  Total:               %d" % self.pages_total)
             acc.append(u"  With Language Block: %d (%.3f%%)" % (self.pages_with_language_block, self.pages_with_language_block_percentage))
             acc.append(u"  With IPA:            %d (%.3f%%)" % (self.pages_with_ipa, self.pages_with_ipa_percentage))
+            for title, prefix in [(u"Chunk cache", u"cache"), (u"Extraction store", u"store")]:
+                hits = self.counters.get(prefix + u"_hits")
+                misses = self.counters.get(prefix + u"_misses")
+                if (hits is not None) or (misses is not None):
+                    acc.append(title)
+                    acc.append(u"  Hits:                %d" % (hits or 0))
+                    acc.append(u"  Misses:              %d" % (misses or 0))
+            if u"update_kept" in self.counters:
+                acc.append(u"Lexicon update")
+                acc.append(u"  Kept:                %d" % self.counters.get(u"update_kept", 0))
+                acc.append(u"  Updated:             %d" % self.counters.get(u"update_updated", 0))
+                acc.append(u"  Inserted:            %d" % self.counters.get(u"update_inserted", 0))
+                acc.append(u"  Deleted:             %d" % self.counters.get(u"update_deleted", 0))
             ret = u"\n".join(acc)
         return ret
 
@@ -28,6 +28,12 @@ class BaseParser(object):
     LB_TARGET = ""
     LB_TARGET_MAX_LENGTH_STOP = None
 
+    # literal string contained in the line starting the language block
+    # (e.g. "==English=="), so that a text not containing it
+    # can be rejected without splitting it into lines;
+    # None means that the parser does not declare it
+    LB_NEEDLE = None
+
     # start the pronunciation block
     PB_REGEX = None
 
@@ -97,7 +103,22 @@ class BaseParser(object):
         saying if the there is a correct language block in the text,
         and ipa is the IPA string (or None).
         """
-        lb_lines = self.find_language_block(text)
+        if (self.LB_NEEDLE is not None) and (self.LB_NEEDLE not in text):
+            return (False, None)
+        return self.extract_ipa_string_from_lines(text.split("\n"))
+
+    def extract_ipa_string_from_lines(self, lines):
+        """
+        Extract the IPA string from the given list of lines
+        of the wikitext of a <page> (i.e., a word),
+        so that several parsers can share the same split text.
+
+        Unlike extract_ipa_string, the text is not checked
+        against LB_NEEDLE.
+
+        Return a tuple (has_lang, ipa), as extract_ipa_string.
+        """
+        lb_lines = self.find_language_block_in_lines(lines)
         if lb_lines is None:
             return (False, None)
         #print("=== LANGUAGE BLOCK ===")
@@ -189,10 +210,15 @@ class BaseParser(object):
         """
         Find the correct language block.
         """
+        return self.find_language_block_in_lines(text.split("\n"))
+
+    def find_language_block_in_lines(self, lines):
+        """
+        Find the correct language block in the given list of lines.
+        """
         inside = False
         start = -1
         stop = -1
-        lines = text.split("\n")
         for i in range(len(lines)):
             line = lines[i]
             m = re.search(self.lb_regex, line)
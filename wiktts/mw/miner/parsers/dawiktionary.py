@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "="
     LB_DELIMITER_CLOSE = "}}$"
     LB_TARGET = "da"
+    LB_NEEDLE = "=da="
 
     PB_REGEX = "{{-pronun-}}"
 
@@ -47,6 +47,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "}}"
     LB_DELIMITER_CLOSE = ""
     LB_TARGET = "Deutsch"
+    LB_NEEDLE = "{{Sprache|Deutsch}}"
 
     PB_REGEX = "{{Aussprache}}"
 
@@ -56,6 +56,7 @@ class Parser(BaseParser):
     LB_SUFFIX = ""
     LB_DELIMITER_CLOSE = "==$"
     LB_TARGET = "English"
+    LB_NEEDLE = "==English=="
     
     PB_REGEX = "===Pronunciation==="
 
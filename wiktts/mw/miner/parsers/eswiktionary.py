@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "}}"
     LB_DELIMITER_CLOSE = "=="
     LB_TARGET = "es"
+    LB_NEEDLE = "{{lengua|es}}"
 
     REGEX_1 = re.compile(r"{{pron-graf\|([^}]*)}}")
     def clean_regex(match):
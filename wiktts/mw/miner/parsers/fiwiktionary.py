@@ -43,6 +43,7 @@ class Parser(BaseParser):
     LB_SUFFIX = ""
     LB_DELIMITER_CLOSE = "==$"
     LB_TARGET = "Suomi"
+    LB_NEEDLE = "==Suomi=="
     
     PB_REGEX = u"====Ääntäminen===="
 
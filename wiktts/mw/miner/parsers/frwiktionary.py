@@ -49,6 +49,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "}}"
     LB_DELIMITER_CLOSE = "=="
     LB_TARGET = "fr"
+    LB_NEEDLE = "{{langue|fr}}"
     
     PB_REGEX = "=== {{S\|prononciation}} ==="
 
@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_DELIMITER_CLOSE = "}}$"
     LB_TARGET = "is"
     LB_TARGET_MAX_LENGTH_STOP = 2
+    LB_NEEDLE = "-is-"
 
     PB_REGEX = u"{{-framburður-}}" 
 
@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "-}}"
     LB_DELIMITER_CLOSE = "==$"
     LB_TARGET = "it"
+    LB_NEEDLE = "{{-it-}}"
 
     PB_REGEX = "{{-pron-}}"
 
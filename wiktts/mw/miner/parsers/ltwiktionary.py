@@ -41,6 +41,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "}}"
     LB_DELIMITER_CLOSE = "==$"
     LB_TARGET = "ltv"
+    LB_NEEDLE = "{{ltv}}"
 
     PB_REGEX = "=== Tarimas ==="
 
@@ -42,6 +42,7 @@ class Parser(BaseParser):
     LB_DELIMITER_CLOSE = "}}$"
     LB_TARGET = "lv"
     LB_TARGET_MAX_LENGTH_STOP = 2
+    LB_NEEDLE = "-lv-"
 
     PB_REGEX = "===Izruna==="
 
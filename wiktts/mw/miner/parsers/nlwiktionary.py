@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "="
     LB_DELIMITER_CLOSE = "}}$"
     LB_TARGET = "nld"
+    LB_NEEDLE = "=nld="
 
     PB_REGEX = "{{-pron-}}"
 
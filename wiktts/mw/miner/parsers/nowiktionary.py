@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_SUFFIX = ""
     LB_DELIMITER_CLOSE = "==$"
     LB_TARGET = "Norsk"
+    LB_NEEDLE = "==Norsk=="
    
     PB_REGEX = "====Uttale===="
 
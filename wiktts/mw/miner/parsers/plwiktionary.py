@@ -40,6 +40,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "}}"
     LB_DELIMITER_CLOSE = ""
     LB_TARGET = "polski"
+    LB_NEEDLE = u"{{język polski}}"
 
     PB_REGEX = "{{wymowa}}"
 
@@ -65,6 +65,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "-}}"
     LB_DELIMITER_CLOSE = "=$"
     LB_TARGET = "pt"
+    LB_NEEDLE = "{{-pt-}}"
 
     PB_REGEX = u"^==[^pP]*[pP]ronúncia[^=]*==$"  # pronúncia
 
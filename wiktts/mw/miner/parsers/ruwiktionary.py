@@ -44,6 +44,7 @@ class Parser(BaseParser):
     LB_SUFFIX = "-}}"
     LB_DELIMITER_CLOSE = "=$"
     LB_TARGET = "ru"
+    LB_NEEDLE = "{{-ru-}}"
 
     PB_REGEX = u"=== Произношение ==="
 
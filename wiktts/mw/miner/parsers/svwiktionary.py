@@ -42,6 +42,7 @@ class Parser(BaseParser):
     LB_SUFFIX = ""
     LB_DELIMITER_CLOSE = "==$"
     LB_TARGET = "Svenska"
+    LB_NEEDLE = "==Svenska=="
 
     REGEX_1 = re.compile(r"{{uttal\|([^}]*)}}")
     def clean_regex(match):
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A pipeline of stages, each running in its own thread,
+connected by bounded queues.
+
+Each stage consumes the items produced by the previous one,
+and a full queue blocks its producer (backpressure),
+hence memory usage stays bounded, and the pipeline
+runs at the pace of its slowest stage,
+instead of at the pace of the sum of its stages.
+
+Decompression (bz2, zlib, lzma, or an external process)
+and lxml parsing release the GIL, hence they overlap
+with the pure Python stages even if these run in threads.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import threading
+import time
+
+try:
+    # python 3
+    from queue import Full
+    from queue import Queue
+except ImportError:
+    # python 2
+    from Queue import Full
+    from Queue import Queue
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# marks the end of the items of a stage
+DONE = object()
+
+class Stage(object):
+    """
+    A stage of a Pipeline, iterating over the given items in its own thread,
+    and putting them into a bounded queue.
+
+    Iterate over the stage to get the items, in order.
+    """
+
+    # seconds between two checks of the stopped flag, while blocked
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, name, items, queue_size, size=None, unit=None):
+        self.name = name
+        self.items = items
+        self.size = size
+        self.unit = unit
+        self.queue = Queue(maxsize=queue_size)
+        self.queue_size = queue_size
+        self.stopped = threading.Event()
+        self.error = None
+        self.thread = None
+        # statistics
+        self.items_total = 0
+        self.size_total = 0
+        self.start_time = None
+        self.end_time = None
+        self.blocked = 0.0
+        self.starved = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+    @property
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    @property
+    def depth_average(self):
+        if self.items_total == 0:
+            return 0.0
+        return self.depth_sum / self.items_total
+
+    def _put(self, item):
+        """
+        Put the given item into the queue,
+        blocking while the queue is full, unless the stage is stopped.
+        """
+        t = time.time()
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=self.POLL_INTERVAL)
+                break
+            except Full:
+                pass
+        self.blocked += time.time() - t
+
+    def _run(self):
+        iterator = iter(self.items)
+        try:
+            while not self.stopped.is_set():
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                self.items_total += 1
+                if self.size is not None:
+                    self.size_total += self.size(item)
+                depth = self.queue.qsize()
+                self.depth_sum += depth
+                self.depth_max = max(self.depth_max, depth)
+                self._put(item)
+        except Exception as exc:
+            self.error = exc
+        finally:
+            # NOTE close the upstream stages (if any) as well,
+            #      in case this stage has been stopped early
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            self.end_time = time.time()
+            self._put(DONE)
+
+    def __iter__(self):
+        self.start_time = time.time()
+        self.thread = threading.Thread(target=self._run, name=self.name)
+        self.thread.daemon = True
+        self.thread.start()
+        try:
+            while True:
+                t = time.time()
+                item = self.queue.get()
+                self.starved += time.time() - t
+                if item is DONE:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                yield item
+        finally:
+            self.stopped.set()
+
+
+
+class Pipeline(object):
+    """
+    A pipeline of stages, with the given names,
+    in their upstream to downstream order::
+
+        pipeline = Pipeline([u"read", u"parse", u"write"], queue_size=8)
+        lines = pipeline.stage(u"read", read(file_obj))
+        pages = pipeline.stage(u"parse", (parse(l) for l in lines))
+        pipeline.sink(u"write", pages, write)
+
+    The last stage (sink) runs in the calling thread.
+    """
+
+    def __init__(self, names, queue_size=8):
+        if queue_size < 1:
+            raise ValueError(u"The queue size must be at least 1. (Got '%d')" % queue_size)
+        self.names = names
+        self.queue_size = queue_size
+        self.stages = dict()
+        self.sink_name = None
+        self.sink_unit = None
+        self.sink_items = 0
+        self.sink_size = 0
+        self.sink_busy = 0.0
+        self.sink_elapsed = 0.0
+
+    def stage(self, name, items, size=None, unit=None):
+        """
+        Return a Stage iterating over the given items in its own thread.
+
+        If size is not None, it is a function returning
+        the size of an item, in the given unit (e.g., u"pages"),
+        to compute the throughput of the stage in that unit as well.
+        """
+        if name not in self.names:
+            raise ValueError(u"Unknown stage. (Got '%s')" % name)
+        stage = Stage(name, items, self.queue_size, size=size, unit=unit)
+        self.stages[name] = stage
+        return stage
+
+    def sink(self, name, items, function, size=None, unit=None):
+        """
+        Call the given function on each of the given items,
+        in the calling thread.
+        """
+        if name not in self.names:
+            raise ValueError(u"Unknown stage. (Got '%s')" % name)
+        self.sink_name = name
+        self.sink_unit = unit
+        start_time = time.time()
+        for item in items:
+            t = time.time()
+            function(item)
+            self.sink_busy += time.time() - t
+            self.sink_items += 1
+            if size is not None:
+                self.sink_size += size(item)
+            self.sink_elapsed = time.time() - start_time
+
+    def _upstream(self, name):
+        """
+        Return the stage feeding the stage with the given name, if any.
+        """
+        upstream = None
+        for n in self.names:
+            if n == name:
+                return upstream
+            if n in self.stages:
+                upstream = self.stages[n]
+        return upstream
+
+    def pretty_print(self, single_line=False):
+        if single_line:
+            names = [n for n in self.names if n in self.stages]
+            return u"Queues %s:   %s" % (
+                u"/".join(names),
+                u" / ".join([u"%d" % self.stages[n].depth for n in names])
+            )
+        acc = []
+        acc.append(u"Pipeline (queue size: %d)" % self.queue_size)
+        for name in self.names:
+            upstream = self._upstream(name)
+            starved = upstream.starved if upstream is not None else 0.0
+            if name in self.stages:
+                stage = self.stages[name]
+                items, size, unit, elapsed = stage.items_total, stage.size_total, stage.unit, stage.elapsed
+                busy = elapsed - starved - stage.blocked
+                queue = u", queue depth %.1f (max %d)" % (stage.depth_average, stage.depth_max)
+            elif name == self.sink_name:
+                items, size, unit, elapsed = self.sink_items, self.sink_size, self.sink_unit, self.sink_elapsed
+                busy = self.sink_busy
+                queue = u""
+            else:
+                continue
+            elapsed = max(elapsed, 1e-6)
+            throughput = u"%.1f items/s" % (items / elapsed)
+            if unit is not None:
+                throughput += u", %.1f %s/s" % (size / elapsed, unit)
+            acc.append(u"  %-11s %d items, %s, busy %.1f%%%s" % (
+                name + u":",
+                items,
+                throughput,
+                max(busy, 0.0) / elapsed * 100,
+                queue
+            ))
+        return u"\n".join(acc)
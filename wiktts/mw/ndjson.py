@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Read and write MediaWiki pages as newline-delimited JSON (NDJSON),
+one record per line, with keys ``id``, ``ns``, ``title``, ``text``,
+and ``sha1`` (the SHA1 of the text, as in the dump),
+so that they can be streamed through a Unix pipe,
+for example from ``wiktts.mw.splitter`` to ``wiktts.mw.miner``.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import json
+import sys
+
+from wiktts.mw.page import Page
+from wiktts.mw.rawpage import get_id
+from wiktts.mw.rawpage import get_ns
+from wiktts.mw.rawpage import get_sha1
+from wiktts.mw.rawpage import get_text
+from wiktts.mw.rawpage import get_title
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+def binary_stdin():
+    try:
+        # python 3
+        return sys.stdin.buffer
+    except AttributeError:
+        # python 2
+        return sys.stdin
+
+def binary_stdout():
+    try:
+        # python 3
+        return sys.stdout.buffer
+    except AttributeError:
+        # python 2
+        return sys.stdout
+
+def format_record(contents):
+    """
+    Return the NDJSON record (UTF-8 encoded byte string,
+    terminated by a newline) of the given raw page.
+    """
+    record = {
+        u"id": get_id(contents),
+        u"ns": get_ns(contents),
+        u"title": get_title(contents),
+        u"text": get_text(contents),
+        u"sha1": get_sha1(contents),
+    }
+    line = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    if not isinstance(line, bytes):
+        line = line.encode("utf-8")
+    return line + b"\n"
+
+def read_sized_pages(input_file):
+    """
+    A generator yielding a (size, page) tuple
+    for each NDJSON record read from the given binary file object,
+    where page is a Page object and size is the length in bytes of the record.
+    Empty lines are ignored.
+    """
+    for line in input_file:
+        line = line.strip()
+        if len(line) == 0:
+            continue
+        try:
+            record = json.loads(line.decode("utf-8"))
+        except ValueError:
+            raise ValueError(u"Malformed NDJSON record. (Got '%s')" % line[:80])
+        yield (len(line), Page.from_record(record))
+
+def read_pages(input_file):
+    """
+    A generator yielding a Page object
+    for each NDJSON record read from the given binary file object.
+    Empty lines are ignored.
+    """
+    for size, page in read_sized_pages(input_file):
+        yield page
@@ -3,10 +3,23 @@
 
 """
 A MediaWiki ``<page>`` object.
+
+The page id, title, and namespace are read when the object is created,
+while the revision id, timestamp, text, and text SHA1 are read
+from the underlying XML element only when first accessed,
+so that pages discarded by a filter on the former do not pay for the latter.
+
+A page can also be created from its raw bytes (see ``from_raw``),
+matching them against the rigid layout of a MediaWiki dump
+instead of parsing them as XML.
 """
 
 from __future__ import absolute_import
 from __future__ import print_function
+import re
+
+from wiktts.mw.rawpage import decode
+from wiktts.mw.rawpage import get_field
 
 __author__ = "Alberto Pettarin"
 __copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
@@ -15,26 +28,223 @@ __email__ = "alberto@albertopettarin.it"
 
 NAMESPACES = {"ns": "http://www.mediawiki.org/xml/export-0.10/"}
 
+# tags in Clark notation, compared with the tags of the child elements,
+# instead of (compiling and) evaluating an XPath expression for each page
+TAG_ID = "{%s}id" % NAMESPACES["ns"]
+TAG_NS = "{%s}ns" % NAMESPACES["ns"]
+TAG_REVISION = "{%s}revision" % NAMESPACES["ns"]
+TAG_SHA1 = "{%s}sha1" % NAMESPACES["ns"]
+TAG_TEXT = "{%s}text" % NAMESPACES["ns"]
+TAG_TIMESTAMP = "{%s}timestamp" % NAMESPACES["ns"]
+TAG_TITLE = "{%s}title" % NAMESPACES["ns"]
+
+# the layout of a raw page in a MediaWiki dump,
+# capturing title, ns, id, and revision id, timestamp, and text
+# NOTE the captured values cannot contain markup (CDATA sections, comments),
+#      since "<" is escaped in the text nodes of a dump
+RAW_PAGE_REGEX = re.compile(
+    br"<page>\s*<title>([^<]*)</title>\s*<ns>([^<]*)</ns>\s*<id>([^<]*)</id>" +
+    br".*?<revision>\s*<id>([^<]*)</id>" +
+    br".*?<timestamp>([^<]*)</timestamp>" +
+    br".*?<text[^>]*?(?:/>|>([^<]*)</text>)",
+    re.DOTALL
+)
+
+# characters which might be escaped or normalized in a raw text,
+# see text_contains
+RAW_UNSAFE = u"&;<>\"'\r\n"
+
+# marks a lazy field not read yet
+UNSET = object()
+
+def _child_text(element, tag):
+    """
+    Return the text of the first child of the given element
+    with the given tag, or None if there is no such child.
+    """
+    if element is not None:
+        for child in element:
+            if child.tag == tag:
+                return child.text
+    return None
+
 class Page(object):
-    
+
+    __slots__ = [
+        "id",
+        "title",
+        "ns",
+        "_revision",
+        "_revision_id",
+        "_revision_timestamp",
+        "_revision_text",
+        "_revision_sha1",
+        "_raw_text",
+    ]
+
     def __init__(self, page_obj, full_parsing=False):
         self.id = None
         self.title = None
         self.ns = None
-        self.revision_id = None
-        self.revision_timestamp = None
-        self.revision_text = None
+        self._revision = None
+        self._revision_id = UNSET
+        self._revision_timestamp = UNSET
+        self._revision_text = UNSET
+        self._revision_sha1 = UNSET
+        self._raw_text = None
         self._parse(page_obj, full_parsing)
 
     def _parse(self, p, full_parsing=False):
-        self.id = p.xpath("ns:id", namespaces=NAMESPACES)[0].text
-        self.title = p.xpath("ns:title", namespaces=NAMESPACES)[0].text or ""
-        revision = p.xpath("ns:revision", namespaces=NAMESPACES)[0]
-        self.revision_text = revision.xpath("ns:text", namespaces=NAMESPACES)[0].text or ""
+        # the header (title, ns, id, ...) precedes the revisions
+        # NOTE keep the last revision, which is the current one
+        #      if the page has several (e.g., in incremental dumps)
+        for child in p:
+            tag = child.tag
+            if tag == TAG_TITLE:
+                self.title = child.text or ""
+            elif tag == TAG_NS:
+                self.ns = child.text
+            elif (tag == TAG_ID) and (self.id is None):
+                self.id = child.text
+            elif tag == TAG_REVISION:
+                self._revision = child
+        if self.title is None:
+            self.title = ""
         if full_parsing:
-            self.ns = p.xpath("ns:ns", namespaces=NAMESPACES)[0].text
-            self.revision_id = revision.xpath("ns:id", namespaces=NAMESPACES)[0].text
-            self.revision_timestamp = revision.xpath("ns:timestamp", namespaces=NAMESPACES)[0].text
+            self.detach()
+
+    @property
+    def revision_id(self):
+        if self._revision_id is UNSET:
+            self._revision_id = _child_text(self._revision, TAG_ID)
+        return self._revision_id
+    @revision_id.setter
+    def revision_id(self, value):
+        self._revision_id = value
+
+    @property
+    def revision_timestamp(self):
+        if self._revision_timestamp is UNSET:
+            self._revision_timestamp = _child_text(self._revision, TAG_TIMESTAMP)
+        return self._revision_timestamp
+    @revision_timestamp.setter
+    def revision_timestamp(self, value):
+        self._revision_timestamp = value
+
+    @property
+    def revision_text(self):
+        if self._revision_text is UNSET:
+            if self._raw_text is not None:
+                self._revision_text = decode(self._raw_text)
+            else:
+                self._revision_text = _child_text(self._revision, TAG_TEXT) or ""
+        return self._revision_text
+    @revision_text.setter
+    def revision_text(self, value):
+        self._revision_text = value
+
+    @property
+    def revision_sha1(self):
+        """
+        The SHA1 of the revision text, as stored in the dump
+        (base 36, Unicode string), or None if not available.
+        """
+        if self._revision_sha1 is UNSET:
+            self._revision_sha1 = _child_text(self._revision, TAG_SHA1) or None
+        return self._revision_sha1
+    @revision_sha1.setter
+    def revision_sha1(self, value):
+        self._revision_sha1 = value
 
+    def text_contains(self, string):
+        """
+        Return True if the revision text contains the given string.
 
+        If the text has not been decoded yet, and the string cannot be
+        affected by decoding (no characters in RAW_UNSAFE),
+        the raw text is searched instead, without decoding it.
+        """
+        if (
+            (self._revision_text is UNSET) and
+            (self._raw_text is not None) and
+            (not any(c in RAW_UNSAFE for c in string))
+        ):
+            if string.encode("utf-8") in self._raw_text:
+                return True
+            if b"&#" not in self._raw_text:
+                return False
+            # a character reference might encode part of the string
+        return string in self.revision_text
+
+    def detach(self):
+        """
+        Read the lazy fields not read yet,
+        and release the underlying XML element,
+        which can then be cleared or freed.
+        """
+        self.revision_id
+        self.revision_timestamp
+        self.revision_text
+        self.revision_sha1
+        self._revision = None
+        self._raw_text = None
+        return self
+
+    @classmethod
+    def from_raw(cls, contents, full_parsing=False):
+        """
+        Create a Page from the given raw page,
+        that is, the UTF-8 encoded byte string from <page> to </page>,
+        matching it against the layout of the pages in a MediaWiki dump.
+        The revision text is decoded only when first accessed.
+        The SHA1 of the revision text is searched
+        in the rest of the revision.
+
+        Raise ValueError if the page does not match the layout,
+        or if it has more than one revision,
+        so that the caller can parse it as XML instead.
+        """
+        match = RAW_PAGE_REGEX.match(contents)
+        if match is None:
+            raise ValueError(u"Unexpected layout of raw page")
+        # NOTE the fields must come from the first revision
+        if contents.find(b"</revision>", match.start(4), match.end()) != -1:
+            raise ValueError(u"Unexpected layout of raw page revision")
+        title, ns, page_id, revision_id, timestamp, text = match.groups()
+        # NOTE "<" is escaped in the text, hence a "<sha1>" is an element
+        revision_end = contents.find(b"</revision>", match.end())
+        if (revision_end != -1) and (contents.find(b"<revision>", revision_end) != -1):
+            raise ValueError(u"Unexpected layout of raw page with several revisions")
+        sha1 = get_field(contents, b"sha1", match.start(4), len(contents) if revision_end == -1 else revision_end)
+        page = cls.__new__(cls)
+        page.id = page_id.decode("utf-8")
+        page.title = decode(title)
+        page.ns = ns.decode("utf-8")
+        page._revision = None
+        page._revision_id = revision_id.decode("utf-8")
+        page._revision_timestamp = timestamp.decode("utf-8")
+        page._revision_text = UNSET
+        page._revision_sha1 = sha1.decode("utf-8") if sha1 else None
+        page._raw_text = b"" if text is None else text
+        if full_parsing:
+            page.detach()
+        return page
 
+    @classmethod
+    def from_record(cls, record):
+        """
+        Create a Page from a dict with keys
+        ``id``, ``ns``, ``title``, ``text``, and (optionally) ``sha1``
+        (e.g., an NDJSON record), instead of an XML element.
+        """
+        page = cls.__new__(cls)
+        page.id = None if record.get("id") is None else u"%s" % record["id"]
+        page.title = record.get("title") or u""
+        page.ns = None if record.get("ns") is None else u"%s" % record["ns"]
+        page._revision = None
+        page._raw_text = None
+        page.revision_id = None
+        page.revision_timestamp = None
+        page.revision_text = record.get("text") or u""
+        page.revision_sha1 = record.get("sha1") or None
+        return page
@@ -4,14 +4,25 @@
 """
 Parse MediaWiki dump files, exposing user-friendly
 functions to access their pages.
+
+Use ``parse_file`` or ``parse_string`` to build the list of all the pages,
+or ``iter_pages`` to stream them, in constant memory.
+
+Two engines are available: ``lxml`` (default), parsing the dump as XML,
+and ``fast``, locating the pages with substring searches
+and matching their fields against the rigid layout of MediaWiki dumps
+(see ``Page.from_raw``), falling back to lxml for any page not matching it.
 """
 
 from __future__ import absolute_import
 from __future__ import print_function
 from lxml import etree
+import io
 import os
 import sys
 
+from wiktts.mw.compression import compression_of
+from wiktts.mw.compression import open_file
 from wiktts.mw.page import Page
 
 __author__ = "Alberto Pettarin"
@@ -21,11 +32,26 @@ __email__ = "alberto@albertopettarin.it"
 
 NAMESPACES = {"ns": "http://www.mediawiki.org/xml/export-0.10/"}
 
+PAGE_TAG = "{%s}page" % NAMESPACES["ns"]
+
+ENGINES = [u"lxml", u"fast"]
+
 class Parser(object):
 
-    def __init__(self, full_parsing=False):
+    # the fast engine reads files in blocks of this many bytes
+    BLOCK_SIZE = 4 * 1024 * 1024
+
+    MEDIAWIKI_OPEN = b"<mediawiki"
+    MEDIAWIKI_XMLNS = ('xmlns="%s"' % NAMESPACES["ns"]).encode("utf-8")
+    PAGE_OPEN = b"<page>"
+    PAGE_CLOSE = b"</page>"
+
+    def __init__(self, full_parsing=False, engine=u"lxml"):
+        if engine not in ENGINES:
+            raise ValueError(u"The engine must be one of %s. (Got '%s')" % (ENGINES, engine))
         self.pages = []
         self.full_parsing = full_parsing
+        self.engine = engine
 
     def _check_dump_file_path(self, dump_file_path):
         if dump_file_path == "-":
@@ -38,22 +64,143 @@ class Parser(object):
         self.pages = []
 
     def parse_file(self, dump_file_path, append=False):
+        if self.engine == u"fast":
+            if not append:
+                self.clear()
+            self.pages.extend(self.iter_pages(dump_file_path))
+            return self
         input_file = self._check_dump_file_path(dump_file_path)
-        root = etree.parse(input_file).getroot()
+        if (input_file is not sys.stdin) and (compression_of(input_file) is not None):
+            with open_file(input_file) as compressed_file:
+                root = etree.parse(compressed_file).getroot()
+        else:
+            root = etree.parse(input_file).getroot()
         return self._parse(root=root, append=append)
 
+    def iter_pages(self, dump_file_path):
+        """
+        A generator yielding a Page object for each <page>
+        in the given dump file (possibly compressed), or in the standard input,
+        parsing it incrementally.
+
+        Each <page> element is cleared as soon as its Page has been created,
+        and so are the already processed elements preceding it,
+        hence memory usage does not grow with the size of the dump.
+        Unlike parse_file, the pages are not stored in self.pages.
+        """
+        input_file = self._check_dump_file_path(dump_file_path)
+        if self.engine == u"fast":
+            if input_file is sys.stdin:
+                for page in self._iter_raw_pages(getattr(sys.stdin, "buffer", sys.stdin)):
+                    yield page
+            else:
+                with open_file(input_file) as dump_file:
+                    for page in self._iter_raw_pages(dump_file):
+                        yield page
+        elif input_file is sys.stdin:
+            # NOTE lxml needs a binary file object
+            for page in self._iter_pages(getattr(sys.stdin, "buffer", sys.stdin)):
+                yield page
+        elif compression_of(input_file) is not None:
+            with open_file(input_file) as compressed_file:
+                for page in self._iter_pages(compressed_file):
+                    yield page
+        else:
+            for page in self._iter_pages(input_file):
+                yield page
+
+    def _iter_pages(self, source):
+        for event, elem in etree.iterparse(source, events=("end",), tag=PAGE_TAG):
+            page = Page(elem, full_parsing=self.full_parsing)
+            yield page
+            # read the lazy fields of the page (it might be kept by the caller),
+            # then free the memory used by this page and the preceding ones
+            page.detach()
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def _iter_raw_pages(self, dump_file):
+        """
+        The fast engine: a generator yielding a Page object
+        for each <page> in the given binary file object,
+        read in blocks and scanned for the page delimiters.
+        Each page is created from its bytes, unless it has
+        an unexpected layout, in which case it is parsed by lxml.
+        """
+        buf = b""
+        header_checked = False
+        # NOTE while buf starts with a page whose end has not been read yet,
+        #      the following blocks are only searched for the end of the page,
+        #      and joined to buf once it is found, so that a page spanning
+        #      many blocks is not copied once per block
+        incomplete = False
+        blocks = []
+        overlap = b""
+        for data in iter(lambda: dump_file.read(self.BLOCK_SIZE), b""):
+            if incomplete:
+                # the end of the page might straddle the bytes read so far and this block
+                window = overlap + data
+                if window.find(self.PAGE_CLOSE) == -1:
+                    blocks.append(data)
+                    overlap = window[len(window) - len(self.PAGE_CLOSE) + 1:]
+                    continue
+                buf = b"".join([buf] + blocks + [data])
+                blocks = []
+                incomplete = False
+            else:
+                buf += data
+            pos = 0
+            while True:
+                start = buf.find(self.PAGE_OPEN, pos)
+                if start == -1:
+                    # keep the tail, it might contain a truncated "<page>"
+                    pos = max(pos, len(buf) - len(self.PAGE_OPEN) + 1)
+                    break
+                if not header_checked:
+                    # NOTE like the lxml engine, find no page
+                    #      if the dump uses another export schema
+                    root_start = buf.find(self.MEDIAWIKI_OPEN, 0, start)
+                    if (root_start != -1) and (buf.find(self.MEDIAWIKI_XMLNS, root_start, start) == -1):
+                        return
+                    header_checked = True
+                end = buf.find(self.PAGE_CLOSE, start)
+                if end == -1:
+                    # the page continues in the next block
+                    pos = start
+                    incomplete = True
+                    overlap = buf[max(start, len(buf) - len(self.PAGE_CLOSE) + 1):]
+                    break
+                end += len(self.PAGE_CLOSE)
+                yield self._raw_page(buf[start:end])
+                pos = end
+            buf = buf[pos:]
+
+    def _raw_page(self, contents):
+        try:
+            return Page.from_raw(contents, full_parsing=self.full_parsing)
+        except ValueError:
+            # parse the page as XML, inside a root element declaring the namespace
+            root = etree.fromstring(self.MEDIAWIKI_OPEN + b" " + self.MEDIAWIKI_XMLNS + b">" + contents + b"</mediawiki>")
+            return Page(root[0], full_parsing=self.full_parsing)
+
     def parse_string(self, string, append=False):
         try:
             string = string.encode("utf-8")
         except:
             pass
+        if self.engine == u"fast":
+            if not append:
+                self.clear()
+            self.pages.extend(self._iter_raw_pages(io.BytesIO(string)))
+            return self
         root = etree.fromstring(string)
         return self._parse(root=root, append=append)
 
     def _parse(self, root, append=False):
         if not append:
             self.clear()
-        for page in root.xpath("ns:page", namespaces=NAMESPACES):
+        for page in root.iterchildren(PAGE_TAG):
             self.pages.append(Page(page, full_parsing=self.full_parsing))
         return self
 
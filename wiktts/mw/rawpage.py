@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A MediaWiki ``<page>`` as found in the dump, that is,
+as a UTF-8 encoded byte string, not parsed as XML,
+and related useful functions.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from collections import namedtuple
+import re
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# ns:            the value of <ns> (int), or None
+# stream_offset: byte offset of the (bz2) stream containing the page,
+#                always 0 for uncompressed or single stream dumps
+# offset:        byte offset of <page> in the decompressed stream
+# contents:      the byte string from <page> to </page>, included
+RawPage = namedtuple("RawPage", ["ns", "stream_offset", "offset", "contents"])
+
+ENTITY_REGEX = re.compile(u"&(#[0-9]+|#x[0-9a-fA-F]+|lt|gt|amp|quot|apos);")
+
+ENTITIES = {
+    u"lt": u"<",
+    u"gt": u">",
+    u"amp": u"&",
+    u"quot": u"\"",
+    u"apos": u"'",
+}
+
+ENTITIES_BYTES = dict((name.encode("ascii"), value.encode("ascii")) for name, value in ENTITIES.items())
+
+def _replace_entity(match):
+    name = match.group(1)
+    if name.startswith(u"#x"):
+        return _unichr(int(name[2:], 16))
+    if name.startswith(u"#"):
+        return _unichr(int(name[1:]))
+    return ENTITIES[name]
+
+def _unichr(codepoint):
+    try:
+        # python 2
+        return unichr(codepoint)
+    except NameError:
+        # python 3
+        return chr(codepoint)
+
+def unescape(string):
+    """
+    Replace the XML entities and character references
+    in the given Unicode string.
+    """
+    if u"&" not in string:
+        return string
+    return ENTITY_REGEX.sub(_replace_entity, string)
+
+def decode(value):
+    """
+    Decode the given raw (UTF-8 encoded) text node,
+    normalizing its line breaks and replacing its entities,
+    as an XML parser does, returning a Unicode string.
+    """
+    if b"\r" in value:
+        value = value.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    if b"&" not in value:
+        return value.decode("utf-8")
+    if b"&#" in value:
+        return unescape(value.decode("utf-8"))
+    # only named entities: replacing them in the bytes is faster than a regex
+    parts = value.split(b"&")
+    acc = [parts[0]]
+    for part in parts[1:]:
+        i = part.find(b";", 0, 8)
+        replacement = ENTITIES_BYTES.get(part[:i]) if i != -1 else None
+        if replacement is None:
+            acc.append(b"&")
+            acc.append(part)
+        else:
+            acc.append(replacement)
+            acc.append(part[i + 1:])
+    return b"".join(acc).decode("utf-8")
+
+def get_field(contents, tag, start=0, end=None):
+    """
+    Return the (raw) byte string inside the first <tag>...</tag> element
+    found in contents[start:end], or None if not found.
+
+    The tag must be given as a byte string, e.g. b"title".
+    """
+    if end is None:
+        end = len(contents)
+    tag_open = b"<" + tag + b">"
+    i = contents.find(tag_open, start, end)
+    if i == -1:
+        return None
+    i += len(tag_open)
+    j = contents.find(b"</" + tag + b">", i, end)
+    if j == -1:
+        return None
+    return contents[i:j]
+
+def get_id(contents):
+    """
+    Return the page id (int) of the given raw page, or None.
+
+    The first <id> of a <page> is the page id,
+    the ids of revisions and contributors follow it.
+    """
+    value = get_field(contents, b"id")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def get_title(contents):
+    """
+    Return the (unescaped) title of the given raw page,
+    as a Unicode string, or None.
+    """
+    value = get_field(contents, b"title")
+    if value is None:
+        return None
+    return decode(value)
+
+def get_ns(contents):
+    """
+    Return the namespace (int) of the given raw page, or None.
+    """
+    value = get_field(contents, b"ns")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def last_revision_start(contents):
+    """
+    Return the byte offset of the last <revision> of the given raw page,
+    which is the current one if the page has several
+    (e.g., in incremental dumps), or 0 if not found.
+
+    NOTE "<" is escaped in the text nodes, hence a "<revision>" is an element.
+    """
+    return max(contents.rfind(b"<revision>"), 0)
+
+def get_sha1(contents):
+    """
+    Return the SHA1 (Unicode string, base 36)
+    of the text of the last revision
+    of the given raw page, or None.
+    """
+    value = get_field(contents, b"sha1", last_revision_start(contents))
+    if not value:
+        return None
+    return value.decode("utf-8")
+
+def text_span(contents, start=0, end=None):
+    """
+    Return the tuple (i, j) such that contents[i:j]
+    is the (raw) text of the first <text> element
+    found in contents[start:end], or None if not found.
+
+    Unlike the other fields, <text> has attributes,
+    and it might be an empty element (<text ... />),
+    in which case i == j.
+    """
+    if end is None:
+        end = len(contents)
+    i = contents.find(b"<text", start, end)
+    if i == -1:
+        return None
+    i = contents.find(b">", i, end)
+    if i == -1:
+        return None
+    if contents[i - 1:i] == b"/":
+        return (i + 1, i + 1)
+    i += 1
+    j = contents.find(b"</text>", i, end)
+    if j == -1:
+        return None
+    return (i, j)
+
+def get_text(contents):
+    """
+    Return the (unescaped) text of the last revision
+    of the given raw page, as a Unicode string,
+    or the empty string if not found.
+    """
+    span = text_span(contents, last_revision_start(contents))
+    if span is None:
+        return u""
+    return decode(contents[span[0]:span[1]])
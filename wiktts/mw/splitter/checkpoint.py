@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Checkpoint of a (long) split of a MediaWiki dump,
+allowing to resume it after the last chunk written to file.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from collections import namedtuple
+import io
+import json
+import os
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# dump_file_path: absolute path of the dump file
+# dump_file_size: size in bytes of the dump file
+# settings:       dict with the splitter settings affecting the chunks
+# index:          index of the last chunk written to file
+# pages_total:    pages scanned up to the end of the last chunk
+# pages_ns:       pages extracted up to the end of the last chunk
+# stream_offset:  byte offset of the (bz2) stream where the split resumes
+# offset:         byte offset in the decompressed stream where the split resumes
+# complete:       True if the split has been completed
+Checkpoint = namedtuple("Checkpoint", [
+    "dump_file_path",
+    "dump_file_size",
+    "settings",
+    "index",
+    "pages_total",
+    "pages_ns",
+    "stream_offset",
+    "offset",
+    "complete"
+])
+
+def read_checkpoint(checkpoint_file_path):
+    """
+    Read the checkpoint from the given file,
+    returning a Checkpoint object, or None if the file does not exist.
+    """
+    if not os.path.isfile(checkpoint_file_path):
+        return None
+    with io.open(checkpoint_file_path, "r", encoding="utf-8") as checkpoint_file:
+        d = json.loads(checkpoint_file.read())
+    return Checkpoint(**d)
+
+def write_checkpoint(checkpoint, checkpoint_file_path):
+    """
+    Write the given Checkpoint object to file.
+
+    The file is first written to a temporary file,
+    then renamed, so that a reader never sees a partial checkpoint.
+    """
+    tmp_file_path = checkpoint_file_path + u".tmp"
+    with io.open(tmp_file_path, "w", encoding="utf-8") as checkpoint_file:
+        checkpoint_file.write(u"%s\n" % json.dumps(checkpoint._asdict(), sort_keys=True))
+    try:
+        # python 3
+        os.replace(tmp_file_path, checkpoint_file_path)
+    except AttributeError:
+        # python 2 (POSIX rename overwrites the destination)
+        os.rename(tmp_file_path, checkpoint_file_path)
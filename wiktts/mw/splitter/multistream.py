@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Read a MediaWiki multistream dump (``pages-articles-multistream.xml.bz2``)
+using its companion index (``multistream-index.txt.bz2``).
+
+A multistream dump is the concatenation of independent bz2 streams,
+each holding (at most) 100 ``<page>`` elements,
+and the index lists the byte offset of the stream containing each page.
+Hence, the streams can be decompressed in parallel
+by a pool of worker processes, and then read back in dump order.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from collections import deque
+import bz2
+import io
+import multiprocessing
+import os
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+MULTISTREAM_DUMP_SUFFIX = u"-multistream.xml.bz2"
+MULTISTREAM_INDEX_SUFFIX = u"-multistream-index.txt.bz2"
+
+def guess_index_file_path(dump_file_path):
+    """
+    Return the path of the index file accompanying
+    the given multistream dump file, if it exists,
+    or None otherwise.
+    """
+    if (dump_file_path is None) or (not dump_file_path.endswith(MULTISTREAM_DUMP_SUFFIX)):
+        return None
+    index_file_path = dump_file_path[:-len(MULTISTREAM_DUMP_SUFFIX)] + MULTISTREAM_INDEX_SUFFIX
+    if os.path.isfile(index_file_path):
+        return index_file_path
+    return None
+
+def read_stream_offsets(index_file_path):
+    """
+    Read the given multistream index file,
+    whose lines have the form ``offset:page_id:title``,
+    and return the sorted list of the distinct stream offsets.
+    """
+    offsets = set()
+    with bz2.BZ2File(index_file_path, "r") as index_file:
+        for line in index_file:
+            try:
+                offsets.add(int(line.split(b":", 1)[0]))
+            except ValueError:
+                pass
+    return sorted(offsets)
+
+def decompress_stream(args):
+    """
+    Decompress the bz2 stream(s) stored in the given file,
+    starting at the given offset, for the given length
+    (or until the end of the file, if the length is None).
+
+    Defined at module level, so that it can be sent to a worker process.
+    """
+    dump_file_path, start, length = args
+    with io.open(dump_file_path, "rb") as dump_file:
+        dump_file.seek(start)
+        data = dump_file.read() if length is None else dump_file.read(length)
+    # NOTE the last range might contain more than one stream,
+    #      e.g. the last pages plus the closing </mediawiki>
+    acc = []
+    while len(data) > 0:
+        decompressor = bz2.BZ2Decompressor()
+        acc.append(decompressor.decompress(data))
+        data = decompressor.unused_data
+    return b"".join(acc)
+
+def decompress_range(dump_file_path, stream_offset, size, read_size=1024 * 1024):
+    """
+    Decompress the bz2 stream starting at the given offset
+    (and the following ones, if needed)
+    until at least the given number of bytes has been obtained,
+    returning the decompressed bytes.
+    """
+    acc = []
+    acc_size = 0
+    with io.open(dump_file_path, "rb") as dump_file:
+        dump_file.seek(stream_offset)
+        decompressor = bz2.BZ2Decompressor()
+        while acc_size < size:
+            data = dump_file.read(read_size)
+            if len(data) == 0:
+                break
+            while len(data) > 0:
+                decompressed = decompressor.decompress(data)
+                acc.append(decompressed)
+                acc_size += len(decompressed)
+                data = b""
+                if decompressor.unused_data:
+                    # the current stream ended, start the next one
+                    data = decompressor.unused_data
+                    decompressor = bz2.BZ2Decompressor()
+    return b"".join(acc)
+
+
+
+class MultistreamDump(object):
+    """
+    A multistream dump, decompressed in parallel.
+
+    Use it as a context manager, and call map_streams
+    to get the decompressed streams (or any function of them,
+    computed by the worker processes), in dump order::
+
+        with MultistreamDump(dump_file_path, index_file_path) as dump_file_obj:
+            for stream_offset, data in dump_file_obj.map_streams(decompress_stream):
+                ...
+    """
+
+    def __init__(self, dump_file_path, index_file_path, jobs=None):
+        self.dump_file_path = dump_file_path
+        self.index_file_path = index_file_path
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.pool = None
+
+    def __enter__(self):
+        # NOTE entering again (e.g., from Splitter.raw_pages,
+        #      for a dump entered by the caller) keeps the same pool
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.jobs)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    @property
+    def stream_ranges(self):
+        """
+        The list of ``(start, length)`` byte ranges of the streams.
+        The first range holds the ``<siteinfo>`` header,
+        the last one extends to the end of the file.
+        """
+        offsets = [0] + [o for o in read_stream_offsets(self.index_file_path) if o > 0]
+        ranges = []
+        for i, start in enumerate(offsets):
+            if i + 1 < len(offsets):
+                ranges.append((start, offsets[i + 1] - start))
+            else:
+                ranges.append((start, None))
+        return ranges
+
+    def map_streams(self, func, start_offset=0):
+        """
+        A generator yielding ``(stream_offset, func(args))`` tuples,
+        in dump order, where ``args`` is the tuple
+        ``(dump_file_path, stream_offset, length)`` of each stream
+        starting at or after the given offset,
+        and func is called by the worker processes.
+
+        At most ``2 * jobs`` streams are in flight at any time,
+        so that memory usage stays bounded even if the consumer
+        is slower than the workers.
+        """
+        if self.pool is None:
+            raise ValueError(u"The multistream dump has not been opened yet")
+        pending = deque()
+        for start, length in [r for r in self.stream_ranges if r[0] >= start_offset]:
+            pending.append((start, self.pool.apply_async(func, ((self.dump_file_path, start, length),))))
+            if len(pending) >= 2 * self.jobs:
+                start, result = pending.popleft()
+                yield (start, result.get())
+        while len(pending) > 0:
+            start, result = pending.popleft()
+            yield (start, result.get())
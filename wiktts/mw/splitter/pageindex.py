@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+A persistent index of the pages of a MediaWiki dump,
+mapping each page to its byte offset in the dump,
+so that single pages can be read without rescanning the dump.
+
+The index is stored as an UTF-8 encoded file,
+containing one tab-separated line per page::
+
+    id \t ns \t stream_offset \t offset \t length \t title
+
+where ``stream_offset`` is the byte offset of the bz2 stream
+containing the page (always 0 for uncompressed or single stream dumps),
+``offset`` is the byte offset of ``<page>`` in the decompressed stream,
+and ``length`` is the length in bytes of the page,
+from ``<page>`` to ``</page>``, included.
+
+For looking up single pages, the entries are also stored
+in a SQLite database (sidecar of the page index file),
+indexed by page id and by title, hence a lookup reads
+only a few pages of the database, instead of the whole page index.
+The database is (re)built from the page index file
+if it does not exist or if it is older than the page index file.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from collections import namedtuple
+import io
+import os
+import sqlite3
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+PageIndexEntry = namedtuple("PageIndexEntry", ["id", "ns", "stream_offset", "offset", "length", "title"])
+
+PAGE_INDEX_SUFFIX = u".pageindex"
+
+PAGE_INDEX_DATABASE_SUFFIX = u".sqlite"
+
+class PageIndex(object):
+    """
+    Read and write page index files, streaming their entries.
+
+    To look up single pages, use open_page_index.
+    """
+
+    @classmethod
+    def format_entry(cls, entry):
+        return u"%d\t%s\t%d\t%d\t%d\t%s" % (
+            entry.id,
+            u"" if entry.ns is None else entry.ns,
+            entry.stream_offset,
+            entry.offset,
+            entry.length,
+            entry.title
+        )
+
+    @classmethod
+    def parse_entry(cls, line):
+        acc = line.rstrip(u"\n").split(u"\t", 5)
+        if len(acc) != 6:
+            raise ValueError(u"Malformed page index line. (Got '%s')" % line)
+        return PageIndexEntry(
+            id=int(acc[0]),
+            ns=int(acc[1]) if len(acc[1]) > 0 else None,
+            stream_offset=int(acc[2]),
+            offset=int(acc[3]),
+            length=int(acc[4]),
+            title=acc[5]
+        )
+
+    @classmethod
+    def iter_file(cls, page_index_file_path):
+        """
+        A generator yielding the entries of the given page index file,
+        in file order, without storing them.
+        """
+        if (page_index_file_path is None) or (not os.path.isfile(page_index_file_path)):
+            raise ValueError(u"The page index file path must exist. (Got '%s')" % page_index_file_path)
+        with io.open(page_index_file_path, "r", encoding="utf-8") as page_index_file:
+            for line in page_index_file:
+                yield cls.parse_entry(line)
+
+    @classmethod
+    def write_file(cls, entries, page_index_file_path):
+        """
+        Write the given entries (any iterable) to file,
+        returning the number of entries written.
+        """
+        count = 0
+        with io.open(page_index_file_path, "w", encoding="utf-8") as page_index_file:
+            for entry in entries:
+                page_index_file.write(cls.format_entry(entry) + u"\n")
+                count += 1
+        return count
+
+
+
+class PageIndexDatabase(object):
+    """
+    A page index stored in the SQLite database at the given path,
+    with lookup by page id and by title, reading only
+    the pages of the database (B-tree) needed by the lookup::
+
+        with PageIndexDatabase(database_path) as page_index:
+            entry = page_index.entry_for_title(u"libero")
+
+    If several entries have the same id (title),
+    the last one is returned.
+    """
+
+    # number of entries inserted at once by build
+    BATCH_SIZE = 10000
+
+    def __init__(self, database_path):
+        if (database_path is None) or (not os.path.isfile(database_path)):
+            raise ValueError(u"The page index database path must exist. (Got '%s')" % database_path)
+        self.database_path = database_path
+        self.connection = sqlite3.connect(database_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _entry_for(self, column, value):
+        row = self.connection.execute(
+            u"SELECT id, ns, stream_offset, page_offset, page_length, title FROM pages WHERE %s = ? ORDER BY rowid DESC LIMIT 1" % column,
+            (value,)
+        ).fetchone()
+        if row is None:
+            return None
+        return PageIndexEntry(*row)
+
+    def entry_for_id(self, page_id):
+        return self._entry_for(u"id", page_id)
+
+    def entry_for_title(self, title):
+        return self._entry_for(u"title", title)
+
+    @classmethod
+    def build(cls, entries, database_path):
+        """
+        Write the given entries (any iterable) to a new database
+        at the given path, replacing the existing one, if any,
+        returning the number of entries written.
+        """
+        # NOTE write to a temporary file, then rename it,
+        #      so that an interrupted build does not leave a partial database
+        tmp_path = u"%s.%d.tmp" % (database_path, os.getpid())
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+        count = 0
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.execute(
+                u"CREATE TABLE pages ("
+                u"id INTEGER, "
+                u"ns INTEGER, "
+                u"stream_offset INTEGER NOT NULL, "
+                u"page_offset INTEGER NOT NULL, "
+                u"page_length INTEGER NOT NULL, "
+                u"title TEXT)"
+            )
+            batch = []
+            for entry in entries:
+                batch.append(tuple(entry))
+                count += 1
+                if len(batch) >= cls.BATCH_SIZE:
+                    connection.executemany(u"INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    batch = []
+            connection.executemany(u"INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)", batch)
+            # NOTE creating the indexes after inserting the entries is faster
+            connection.execute(u"CREATE INDEX pages_id ON pages (id)")
+            connection.execute(u"CREATE INDEX pages_title ON pages (title)")
+            connection.commit()
+        finally:
+            connection.close()
+        if os.path.isfile(database_path):
+            os.remove(database_path)
+        os.rename(tmp_path, database_path)
+        return count
+
+
+
+def open_page_index(page_index_file_path):
+    """
+    Return the PageIndexDatabase of the given page index file,
+    building it first if it does not exist,
+    or if it is older than the page index file.
+    """
+    if (page_index_file_path is None) or (not os.path.isfile(page_index_file_path)):
+        raise ValueError(u"The page index file path must exist. (Got '%s')" % page_index_file_path)
+    database_path = page_index_file_path + PAGE_INDEX_DATABASE_SUFFIX
+    if (
+        (not os.path.isfile(database_path)) or
+        (os.path.getmtime(database_path) < os.path.getmtime(page_index_file_path))
+    ):
+        PageIndexDatabase.build(PageIndex.iter_file(page_index_file_path), database_path)
+    return PageIndexDatabase(database_path)
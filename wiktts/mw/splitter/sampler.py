@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Single pass (reservoir) sampling of the pages of a MediaWiki dump,
+optionally stratified by namespace or by title prefix.
+
+Each item added to the sampler gets a random key,
+and the sampler keeps, for each stratum, the items with the smallest keys.
+Since the items of a stratum with the k smallest keys
+are a uniform random sample of the stratum, for any k,
+the sample size of each stratum can be decided at the end of the pass,
+proportionally to the number of items seen in it.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import heapq
+import random
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# ns:     stratify by page namespace
+# prefix: stratify by the (lowercased) first character of the page title
+SAMPLE_STRATA = [u"ns", u"prefix"]
+
+# NOTE the sampler keeps up to size items per stratum,
+#      hence the strata seen after the first MAX_STRATA ones
+#      (e.g., rare title prefixes) are merged into OTHER_STRATUM
+MAX_STRATA = 32
+OTHER_STRATUM = u"<other>"
+
+def title_prefix(title):
+    """
+    Return the lowercased first character of the given title,
+    ignoring its namespace prefix, if any (e.g. "Talk:").
+    """
+    if title is None:
+        return u""
+    if u":" in title:
+        title = title.split(u":", 1)[1] or title
+    return title[:1].lower()
+
+def stratum_sort_key(stratum):
+    """
+    Return a key to sort strata in a total order,
+    even if they mix None (e.g., pages without namespace),
+    OTHER_STRATUM, and namespaces or title prefixes.
+    """
+    if stratum is None:
+        return (1, 0)
+    if stratum == OTHER_STRATUM:
+        return (2, 0)
+    return (0, stratum)
+
+def allocate(size, counts):
+    """
+    Split the given sample size among strata,
+    proportionally to the given number of items in each stratum
+    (a dict stratum -> count), using the largest remainder method.
+
+    Return a dict stratum -> sample size.
+    """
+    total = sum(counts.values())
+    if total <= size:
+        return dict(counts)
+    quotas = dict()
+    remainders = []
+    for stratum in sorted(counts, key=stratum_sort_key):
+        exact = float(size) * counts[stratum] / total
+        quotas[stratum] = int(exact)
+        remainders.append((quotas[stratum] - exact, stratum))
+    # NOTE sorted on (negated remainder, stratum), for a deterministic tie break
+    remainders.sort(key=lambda r: (r[0], stratum_sort_key(r[1])))
+    for remainder, stratum in remainders[:size - sum(quotas.values())]:
+        quotas[stratum] += 1
+    return quotas
+
+
+
+class ReservoirSampler(object):
+    """
+    Draw a uniform random sample of (at most) size items
+    from a sequence of unknown length, in a single pass,
+    keeping at most size items in memory per stratum,
+    with at most max_strata strata plus OTHER_STRATUM,
+    which collects the items of the strata seen after the first max_strata ones::
+
+        sampler = ReservoirSampler(1000, seed=0)
+        for item in items:
+            sampler.add(item, stratum=...)
+        sample = sampler.sample
+
+    The sample is returned in the order the items were added.
+    """
+
+    def __init__(self, size, seed=0, max_strata=MAX_STRATA):
+        if size < 1:
+            raise ValueError(u"The sample size must be at least 1. (Got '%d')" % size)
+        if max_strata < 1:
+            raise ValueError(u"The maximum number of strata must be at least 1. (Got '%d')" % max_strata)
+        self.size = size
+        self.max_strata = max_strata
+        self.random = random.Random(seed)
+        self.counter = 0
+        # stratum -> number of items seen
+        self.counts = dict()
+        # stratum -> heap of (-key, counter, item), i.e., max-heap on key
+        self.reservoirs = dict()
+
+    def add(self, item, stratum=None):
+        """
+        Add the given item, belonging to the given stratum.
+        """
+        key = self.random.random()
+        if (stratum not in self.counts) and (len(self.counts) >= self.max_strata):
+            stratum = OTHER_STRATUM
+        self.counts[stratum] = self.counts.get(stratum, 0) + 1
+        reservoir = self.reservoirs.setdefault(stratum, [])
+        entry = (-key, self.counter, item)
+        self.counter += 1
+        if len(reservoir) < self.size:
+            heapq.heappush(reservoir, entry)
+        elif entry[0] > reservoir[0][0]:
+            # the new key is smaller than the largest key in the reservoir
+            heapq.heapreplace(reservoir, entry)
+
+    @property
+    def sample(self):
+        """
+        The list of the sampled items, in the order they were added.
+
+        If the sampler is stratified, each stratum contributes
+        a number of items proportional to its size.
+        """
+        quotas = allocate(self.size, self.counts)
+        acc = []
+        for stratum, reservoir in self.reservoirs.items():
+            # the quota[stratum] entries with the smallest keys
+            acc.extend(heapq.nlargest(quotas[stratum], reservoir))
+        return [item for key, counter, item in sorted(acc, key=lambda e: e[1])]
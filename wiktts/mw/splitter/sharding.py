@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+"""
+Assign the pages of a MediaWiki dump to shards,
+by a stable hash (CRC32) of their id or title,
+so that independent processes (or machines)
+can each extract a disjoint slice of the dump,
+the union of the slices being the whole dump.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import zlib
+
+__author__ = "Alberto Pettarin"
+__copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
+__license__ = "MIT"
+__email__ = "alberto@albertopettarin.it"
+
+# id:    shard by page id
+# title: shard by (unescaped) page title
+SHARD_KEYS = [u"id", u"title"]
+
+def shard_of(key, shards):
+    """
+    Return the shard (an int between 0 and shards - 1)
+    of the given key (an int page id or a Unicode title).
+
+    Unlike the built-in hash(), CRC32 does not depend
+    on the Python version or on the process,
+    hence every node computes the same assignment.
+    """
+    if key is None:
+        key = u""
+    if not isinstance(key, bytes):
+        key = (u"%s" % key).encode("utf-8")
+    return (zlib.crc32(key) & 0xffffffff) % shards
@@ -11,27 +11,130 @@ Each file or chunk can contain one or more MediaWiki pages.
 
 from __future__ import absolute_import
 from __future__ import print_function
+from collections import deque
 from collections import namedtuple
-import bz2
+from multiprocessing.pool import ThreadPool
+import hashlib
 import io
+import json
+import mmap
+import multiprocessing
 import os
-import re
 import tempfile
 
 from wiktts.commandlinetool import CommandLineTool
+from wiktts.mw.compression import COMPRESSIONS
+from wiktts.mw.compression import DECOMPRESSOR_BACKENDS
+from wiktts.mw.compression import compress
+from wiktts.mw.compression import compression_of
+from wiktts.mw.compression import is_xml_file
+from wiktts.mw.compression import open_dump
+from wiktts.mw.compression import open_file
+from wiktts.mw.ndjson import binary_stdout
+from wiktts.mw.ndjson import format_record
+from wiktts.mw.rawpage import RawPage
+from wiktts.mw.rawpage import get_field
+from wiktts.mw.rawpage import get_id
+from wiktts.mw.rawpage import get_title
+from wiktts.mw.rawpage import unescape
+from wiktts.mw.splitter.checkpoint import Checkpoint
+from wiktts.mw.splitter.checkpoint import read_checkpoint
+from wiktts.mw.splitter.checkpoint import write_checkpoint
+from wiktts.mw.splitter.multistream import MultistreamDump
+from wiktts.mw.splitter.multistream import decompress_range
+from wiktts.mw.splitter.multistream import decompress_stream
+from wiktts.mw.splitter.multistream import guess_index_file_path
+from wiktts.mw.splitter.pageindex import PAGE_INDEX_SUFFIX
+from wiktts.mw.splitter.pageindex import PAGE_INDEX_DATABASE_SUFFIX
+from wiktts.mw.splitter.pageindex import PageIndex
+from wiktts.mw.splitter.pageindex import PageIndexDatabase
+from wiktts.mw.splitter.pageindex import PageIndexEntry
+from wiktts.mw.splitter.pageindex import open_page_index
+from wiktts.mw.splitter.sampler import MAX_STRATA
+from wiktts.mw.splitter.sampler import SAMPLE_STRATA
+from wiktts.mw.splitter.sampler import ReservoirSampler
+from wiktts.mw.splitter.sampler import title_prefix
+from wiktts.mw.splitter.sharding import SHARD_KEYS
+from wiktts.mw.splitter.sharding import shard_of
 
 __author__ = "Alberto Pettarin"
 __copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
 __license__ = "MIT"
 __email__ = "alberto@albertopettarin.it"
 
-Chunk = namedtuple("Chunk", ["pages_total", "pages_ns", "index", "contents"])
+# end_position is the (stream_offset, offset) tuple
+# of the byte following the last page in the chunk
+Chunk = namedtuple("Chunk", ["pages_total", "pages_ns", "index", "contents", "pages", "first_id", "last_id", "end_position"])
+
+PAGE_OPEN = b"<page>"
+
+def count_pages_in_range(args):
+    """
+    Count the "<page>" markers starting in the given byte range
+    of an uncompressed dump file, memory-mapping it.
+
+    Defined at module level, so that it can be sent to a worker process.
+    """
+    dump_file_path, start, end = args
+    with io.open(dump_file_path, "rb") as dump_file:
+        mm = mmap.mmap(dump_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # NOTE extend the range by len(PAGE_OPEN) - 1 bytes,
+            #      so that a marker starting in the range
+            #      but ending in the next one is counted here,
+            #      while a marker starting in the next range cannot fit
+            return mm[start:min(end + len(PAGE_OPEN) - 1, len(mm))].count(PAGE_OPEN)
+        finally:
+            mm.close()
+
+def write_chunk(file_path, mwchunk, compression=None):
+    """
+    Write the given chunk to file, compressing it if requested,
+    and return its manifest record, as a dict.
+    """
+    data = compress(mwchunk.contents, compression)
+    with io.open(file_path, "wb") as chunk_file:
+        chunk_file.write(data)
+    return {
+        "index": mwchunk.index,
+        "path": file_path,
+        "bytes": len(data),
+        "pages": mwchunk.pages,
+        "first_id": mwchunk.first_id,
+        "last_id": mwchunk.last_id,
+        "sha1": hashlib.sha1(data).hexdigest(),
+    }
+
+def count_pages_in_stream(args):
+    """
+    Count the "<page>" markers in the given bz2 stream.
+
+    Defined at module level, so that it can be sent to a worker process.
+    """
+    return decompress_stream(args).count(PAGE_OPEN)
 
 class Splitter(CommandLineTool):
     
-    MEDIAWIKI_OPEN = u'<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.mediawiki.org/xml/export-0.10/ http://www.mediawiki.org/xml/export-0.10.xsd" version="0.10">\n'
-    MEDIAWIKI_CLOSE = u'</mediawiki>'
-    NS_REGEX = re.compile(r"<ns>([0-9]+)<\/ns>")
+    MEDIAWIKI_OPEN = b'<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.mediawiki.org/xml/export-0.10/ http://www.mediawiki.org/xml/export-0.10.xsd" version="0.10">\n'
+    MEDIAWIKI_CLOSE = b'</mediawiki>'
+    PAGE_OPEN = PAGE_OPEN
+    PAGE_CLOSE = b"</page>"
+    NS_OPEN = b"<ns>"
+    NS_CLOSE = b"</ns>"
+    REDIRECT_OPEN = b"<redirect"
+    REVISION_OPEN = b"<revision>"
+
+    # name of the manifest file written by split()
+    MANIFEST_FILE_NAME = u"manifest.jsonl"
+
+    # name of the checkpoint file written by split()
+    CHECKPOINT_FILE_NAME = u"checkpoint.json"
+
+    # read the dump in blocks of this many bytes
+    BLOCK_SIZE = 4 * 1024 * 1024
+
+    # count pages of an uncompressed dump in ranges of this many bytes
+    COUNT_RANGE_SIZE = 64 * 1024 * 1024
 
     AP_PROGRAM = u"wiktts.mw.splitter"
     AP_DESCRIPTION = u"Split a MediaWiki dump into multiple files"
@@ -41,7 +144,28 @@ class Splitter(CommandLineTool):
             "nargs": None,
             "type": str,
             "default": None,
-            "help": "Input MediaWiki dump.xml or dump.xml.bz2"
+            "help": "Input MediaWiki dump.xml or dump.xml.bz2 or dump.xml.gz or dump.xml.xz"
+        },
+        {
+            "name": "--multistream-index",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Index of the multistream dump.xml.bz2 (default: guess from the dump file name)"
+        },
+        {
+            "name": "--decompressor",
+            "nargs": "?",
+            "type": str,
+            "default": u"auto",
+            "help": "Decompress the dump with an external decompressor (e.g. lbzip2) or the Python module [%s] (default: 'auto')" % u"|".join(DECOMPRESSOR_BACKENDS)
+        },
+        {
+            "name": "--jobs",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Number of processes decompressing a multistream dump or counting pages (default: number of CPUs)"
         },
         {
             "name": "--output-dir",
@@ -57,12 +181,59 @@ class Splitter(CommandLineTool):
             "default": [],
             "help": "Extract only pages with namespace in the specified list (default: all)"
         },
+        {
+            "name": "--no-redirects",
+            "action": "store_true",
+            "help": "Do not extract redirect pages"
+        },
+        {
+            "name": "--shards",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Assign pages to this many shards by a stable hash, extracting only the pages of --shard-index (default: do not shard)"
+        },
+        {
+            "name": "--shard-index",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Index of the shard to extract, between 0 and --shards minus 1"
+        },
+        {
+            "name": "--shard-by",
+            "nargs": "?",
+            "type": str,
+            "default": u"id",
+            "help": "Hash this page field to assign it to a shard [%s] (default: 'id')" % u"|".join(SHARD_KEYS)
+        },
         {
             "name": "--pages-per-chunk",
             "nargs": "?",
             "type": int,
-            "default": 1000,
-            "help": "Number of pages per output file (default: 1000)"
+            "default": None,
+            "help": "Maximum number of pages per output file (default: 1000, or no limit with --bytes-per-chunk)"
+        },
+        {
+            "name": "--bytes-per-chunk",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Close an output file once its pages exceed this number of bytes (default: no limit)"
+        },
+        {
+            "name": "--compress",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Compress the output files [%s] (default: do not compress)" % u"|".join(COMPRESSIONS)
+        },
+        {
+            "name": "--writer-jobs",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Number of threads compressing and writing the output files (default: number of CPUs)"
         },
         {
             "name": "--prefix",
@@ -83,11 +254,68 @@ class Splitter(CommandLineTool):
             "action": "store_true",
             "help": "Shortcut for --namespaces 0 --max-number-pages 1000"
         },
+        {
+            "name": "--sample",
+            "nargs": "?",
+            "type": int,
+            "default": None,
+            "help": "Extract a uniform random sample of this many pages, in a single pass (default: extract all pages)"
+        },
+        {
+            "name": "--sample-by",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Stratify the sample by page namespace or title prefix [%s], keeping up to --sample pages in memory for each of the first %d strata, the pages of the other strata being merged into one more stratum (default: do not stratify)" % (u"|".join(SAMPLE_STRATA), MAX_STRATA)
+        },
+        {
+            "name": "--seed",
+            "nargs": "?",
+            "type": int,
+            "default": 0,
+            "help": "Seed of the random sample (default: 0)"
+        },
+        {
+            "name": "--ndjson",
+            "action": "store_true",
+            "help": "Write the pages to standard output as newline-delimited JSON records (id, ns, title, text, sha1), instead of XML files"
+        },
         {
             "name": "--count",
             "action": "store_true",
             "help": "Only count the number of pages"
         },
+        {
+            "name": "--build-index",
+            "action": "store_true",
+            "help": "Only write the page index of the dump (see --page-index)"
+        },
+        {
+            "name": "--page-index",
+            "nargs": "?",
+            "type": str,
+            "default": None,
+            "help": "Page index file path (default: dumpfile%s)" % PAGE_INDEX_SUFFIX
+        },
+        {
+            "name": "--titles",
+            "nargs": "+",
+            "type": str,
+            "default": [],
+            "help": "Only extract the pages with the given titles, using the page index"
+        },
+        {
+            "name": "--ids",
+            "nargs": "+",
+            "type": int,
+            "default": [],
+            "help": "Only extract the pages with the given ids, using the page index"
+        },
+        {
+            "name": "--resume",
+            "action": "store_true",
+            "help": "Resume an interrupted split from the checkpoint in the output directory"
+        },
         {
             "name": "--hide-progress",
             "action": "store_true",
@@ -105,17 +333,53 @@ class Splitter(CommandLineTool):
             dump_file_path=None,
             output_directory_path=None,
             output_file_prefix=u"",
+            output_compression=None,
+            writer_jobs=None,
             pages_per_chunk=1000,
+            bytes_per_chunk=None,
             namespaces=[],
-            max_number_pages=None
+            max_number_pages=None,
+            skip_redirects=False,
+            index_file_path=None,
+            jobs=None,
+            decompressor=u"auto",
+            sample_size=None,
+            sample_strata=None,
+            sample_seed=0,
+            shards=None,
+            shard_index=None,
+            shard_key=u"id"
         ):
         super(Splitter, self).__init__()
         self.dump_file_path = dump_file_path
+        self.index_file_path = index_file_path
+        self.jobs = jobs
+        self.decompressor = decompressor
+        self.__decompressor_logged = False
         self.output_directory_path = output_directory_path
         self.output_file_prefix = output_file_prefix
+        self.output_compression = output_compression
+        self.writer_jobs = writer_jobs
         self.pages_per_chunk = pages_per_chunk
+        self.bytes_per_chunk = bytes_per_chunk
         self.namespaces = namespaces
         self.max_number_pages = max_number_pages
+        self.skip_redirects = skip_redirects
+        self.sample_size = sample_size
+        self.sample_strata = sample_strata
+        self.sample_seed = sample_seed
+        self.shards = shards
+        self.shard_index = shard_index
+        self.shard_key = shard_key
+        self.checkpoint = None
+        # if not None, a function wrapping the generator of the decompressed blocks
+        # read by raw_pages, e.g. to decompress them in another thread
+        # (see wiktts.mw.miner.pipeline)
+        self.blocks_wrapper = None
+        # if not None, the dump file object (see open) read by raw_pages,
+        # opened (and closed) by the caller, e.g. before starting threads,
+        # since entering a MultistreamDump creates a process pool
+        self.dump_file_obj = None
 
     @property
     def dump_file_path(self):
@@ -125,10 +389,46 @@ class Splitter(CommandLineTool):
         if value is not None:
             if not os.path.isfile(value):
                 self.error(u"The dump file must exist. (Got '%s')" % value)
-            if not (value.endswith(u".xml") or value.endswith(u".xml.bz2")):
-                self.error(u"The dump file path must end in '.xml' (uncompressed) or '.xml.bz2' (compressed). (Got '%s')" % value)
+            if not is_xml_file(value):
+                self.error(u"The dump file path must end in '.xml' (uncompressed) or '.xml.bz2', '.xml.gz', '.xml.xz' (compressed). (Got '%s')" % value)
         self.__dump_file_path = value
 
+    @property
+    def index_file_path(self):
+        """
+        The path of the index of the multistream dump file,
+        either set explicitly or guessed from the dump file path.
+        """
+        if self.__index_file_path is not None:
+            return self.__index_file_path
+        return guess_index_file_path(self.dump_file_path)
+    @index_file_path.setter
+    def index_file_path(self, value):
+        if value is not None:
+            if not os.path.isfile(value):
+                self.error(u"The multistream index file must exist. (Got '%s')" % value)
+            if not value.endswith(u".txt.bz2"):
+                self.error(u"The multistream index file path must end in '.txt.bz2'. (Got '%s')" % value)
+        self.__index_file_path = value
+
+    @property
+    def jobs(self):
+        return self.__jobs
+    @jobs.setter
+    def jobs(self, value):
+        if (value is not None) and (value < 1):
+            self.error(u"The number of jobs must be at least 1. (Got: '%d')" % value)
+        self.__jobs = value
+
+    @property
+    def decompressor(self):
+        return self.__decompressor
+    @decompressor.setter
+    def decompressor(self, value):
+        if value not in DECOMPRESSOR_BACKENDS:
+            self.error(u"The decompressor must be one of %s. (Got: '%s')" % (DECOMPRESSOR_BACKENDS, value))
+        self.__decompressor = value
+
     @property
     def output_directory_path(self):
         return self.__output_directory_path
@@ -139,15 +439,42 @@ class Splitter(CommandLineTool):
                 self.error(u"The output directory must exist. (Got: '%s')" % value)
         self.__output_directory_path = value
 
+    @property
+    def output_compression(self):
+        return self.__output_compression
+    @output_compression.setter
+    def output_compression(self, value):
+        if (value is not None) and (value not in COMPRESSIONS):
+            self.error(u"The output compression must be one of %s. (Got: '%s')" % (COMPRESSIONS, value))
+        self.__output_compression = value
+
+    @property
+    def writer_jobs(self):
+        return self.__writer_jobs
+    @writer_jobs.setter
+    def writer_jobs(self, value):
+        if (value is not None) and (value < 1):
+            self.error(u"The number of writer jobs must be at least 1. (Got: '%d')" % value)
+        self.__writer_jobs = value
+
     @property
     def pages_per_chunk(self):
         return self.__pages_per_chunk
     @pages_per_chunk.setter
     def pages_per_chunk(self, value):
-        if value < 1:
+        if (value is not None) and (value < 1):
             self.error(u"The number of pages per chunk must at least 1. (Got: '%d')" % value)
         self.__pages_per_chunk = value
 
+    @property
+    def bytes_per_chunk(self):
+        return self.__bytes_per_chunk
+    @bytes_per_chunk.setter
+    def bytes_per_chunk(self, value):
+        if (value is not None) and (value < 1):
+            self.error(u"The number of bytes per chunk must at least 1. (Got: '%d')" % value)
+        self.__bytes_per_chunk = value
+
     @property
     def namespaces(self):
         return self.__namespaces
@@ -155,18 +482,87 @@ class Splitter(CommandLineTool):
     def namespaces(self, value):
         self.__namespaces = set(value)
 
+    @property
+    def sample_size(self):
+        return self.__sample_size
+    @sample_size.setter
+    def sample_size(self, value):
+        if (value is not None) and (value < 1):
+            self.error(u"The sample size must be at least 1. (Got: '%d')" % value)
+        self.__sample_size = value
+
+    @property
+    def sample_strata(self):
+        return self.__sample_strata
+    @sample_strata.setter
+    def sample_strata(self, value):
+        if (value is not None) and (value not in SAMPLE_STRATA):
+            self.error(u"The sample strata must be one of %s. (Got: '%s')" % (SAMPLE_STRATA, value))
+        self.__sample_strata = value
+
+    @property
+    def shards(self):
+        return self.__shards
+    @shards.setter
+    def shards(self, value):
+        if (value is not None) and (value < 1):
+            self.error(u"The number of shards must be at least 1. (Got: '%d')" % value)
+        self.__shards = value
+
+    @property
+    def shard_index(self):
+        return self.__shard_index
+    @shard_index.setter
+    def shard_index(self, value):
+        # the missing number of shards is reported by actual_command
+        if (value is not None) and (self.shards is not None) and ((value < 0) or (value >= self.shards)):
+            self.error(u"The shard index must be between 0 and the number of shards minus 1. (Got: '%d')" % value)
+        self.__shard_index = value
+
+    @property
+    def shard_key(self):
+        return self.__shard_key
+    @shard_key.setter
+    def shard_key(self, value):
+        if value not in SHARD_KEYS:
+            self.error(u"The shard key must be one of %s. (Got: '%s')" % (SHARD_KEYS, value))
+        self.__shard_key = value
+
     def actual_command(self):
         # options to init the object
         self.dump_file_path = self.vargs["dumpfile"]
+        self.index_file_path = self.vargs["multistream_index"]
+        self.jobs = self.vargs["jobs"]
+        self.decompressor = self.vargs["decompressor"]
         self.output_directory_path = self.vargs["output_dir"]
         self.pages_per_chunk = self.vargs["pages_per_chunk"]
+        self.bytes_per_chunk = self.vargs["bytes_per_chunk"]
+        if (self.pages_per_chunk is None) and (self.bytes_per_chunk is None):
+            self.pages_per_chunk = 1000
         self.output_file_prefix = self.vargs["prefix"]
+        self.output_compression = self.vargs["compress"]
+        self.writer_jobs = self.vargs["writer_jobs"]
         self.namespaces = self.vargs["namespaces"]
         self.max_number_pages = self.vargs["max_number_pages"]
+        self.skip_redirects = self.vargs["no_redirects"]
+        self.sample_size = self.vargs["sample"]
+        self.sample_strata = self.vargs["sample_by"]
+        self.sample_seed = self.vargs["seed"]
+        self.shards = self.vargs["shards"]
+        self.shard_index = self.vargs["shard_index"]
+        self.shard_key = self.vargs["shard_by"]
+        if (self.shards is None) != (self.shard_index is None):
+            self.error(u"The shard index must be specified with the number of shards")
         
         # options to filter/count pages
         head = self.vargs["head"]
+        resume = self.vargs["resume"]
+        ndjson = self.vargs["ndjson"]
         count_pages = self.vargs["count"]
+        build_index = self.vargs["build_index"]
+        page_index_file_path = self.vargs["page_index"]
+        titles = self.vargs["titles"]
+        ids = self.vargs["ids"]
 
         # options controlling print behavior
         show_progress = not self.vargs["hide_progress"]
@@ -178,11 +574,34 @@ class Splitter(CommandLineTool):
             self.print_stderr(u"Option --head: extracting first 1000 pages with namespaces 0")
         if count_pages:
             self.print_stderr(u"Pages total: %s" % self.count_pages())
+        elif build_index:
+            page_index_file_path, pages_indexed = self.build_page_index(page_index_file_path=page_index_file_path)
+            self.print_stderr(u"Created file %s" % page_index_file_path)
+            if print_stats:
+                self.print_stderr(u"Pages indexed: %s" % pages_indexed)
+        elif (len(titles) > 0) or (len(ids) > 0):
+            mwchunk = self.fetch_pages(titles=titles, ids=ids, page_index_file_path=page_index_file_path)
+            if self.output_directory_path is None:
+                self.output_directory_path = tempfile.mkdtemp()
+            file_path = os.path.join(self.output_directory_path, self.output_file_prefix + u"pages.xml")
+            with io.open(file_path, "wb") as chunk_file:
+                chunk_file.write(mwchunk.contents)
+            self.print_stderr(u"Created file %s" % file_path)
+            if print_stats:
+                self.print_stderr(u"Pages requested: %s" % (len(titles) + len(ids)))
+                self.print_stderr(u"Pages found:     %s" % mwchunk.pages_ns)
+        elif ndjson:
+            pages_total, pages_ns = self.write_ndjson(binary_stdout())
+            if print_stats:
+                self.print_stderr(u"Pages total:    %s" % pages_total)
+                self.print_stderr(u"Pages written:  %s" % pages_ns)
         else:
-            pages_total, pages_ns, files_created = self.split(show_progress=show_progress)
+            pages_total, pages_ns, files_created = self.split(show_progress=show_progress, resume=resume)
             if print_stats:
                 self.print_stderr(u"Pages total:    %s" % pages_total)
-                if len(self.namespaces) > 0:
+                if self.sample_size is not None:
+                    self.print_stderr(u"Pages sampled:  %s" % pages_ns)
+                elif (len(self.namespaces) > 0) or (self.shards is not None):
                     self.print_stderr(u"Pages filtered: %s" % pages_ns)
                 self.print_stderr(u"Files created:  %s" % files_created)
 
@@ -190,119 +609,612 @@ class Splitter(CommandLineTool):
         """
         Open the dump file, either compressed or uncompressed,
         returning a file-like object.
+
+        If the dump file is a multistream dump with an index,
+        its streams are decompressed in parallel
+        (unless the external decompressor is explicitly requested).
+        Otherwise, the dump is decompressed according to the
+        decompressor backend, and the choice is printed once.
         """
         if self.dump_file_path is None:
             raise ValueError(u"The dump file path has not been set yet")
-        if self.dump_file_path.endswith(u".xml.bz2"):
-            return bz2.BZ2File(self.dump_file_path, "r")
-        return io.open(self.dump_file_path, "rb")
+        if (
+            (self.dump_file_path.endswith(u".xml.bz2")) and
+            (self.index_file_path is not None) and
+            (self.decompressor != u"external")
+        ):
+            dump_file_obj = MultistreamDump(self.dump_file_path, self.index_file_path, jobs=self.jobs)
+            description = u"bz2 Python module (multistream, %d jobs)" % dump_file_obj.jobs
+        else:
+            try:
+                dump_file_obj, description = open_dump(self.dump_file_path, backend=self.decompressor)
+            except ValueError as exc:
+                self.error(exc)
+        if not self.__decompressor_logged:
+            self.print_stderr(u"Decompressor: %s" % description)
+            self.__decompressor_logged = True
+        return dump_file_obj
 
     def count_pages(self):
         """
         Shortcut to count the number of pages without full parsing.
+
+        An uncompressed dump is memory-mapped and its byte ranges
+        are scanned in parallel, while the streams of a multistream dump
+        are decompressed and scanned in parallel.
+        A single stream compressed dump is decompressed sequentially
+        (possibly by an external, parallel decompressor).
         """
+        if self.dump_file_path is None:
+            raise ValueError(u"The dump file path has not been set yet")
+        if compression_of(self.dump_file_path) is None:
+            size = os.path.getsize(self.dump_file_path)
+            if size == 0:
+                return 0
+            ranges = [(self.dump_file_path, start, start + self.COUNT_RANGE_SIZE) for start in range(0, size, self.COUNT_RANGE_SIZE)]
+            pool = multiprocessing.Pool(min(self.jobs or multiprocessing.cpu_count(), len(ranges)))
+            try:
+                return sum(pool.imap(count_pages_in_range, ranges))
+            finally:
+                pool.terminate()
+                pool.join()
         with self.open() as dump_file_obj:
+            if isinstance(dump_file_obj, MultistreamDump):
+                return sum(count for stream_offset, count in dump_file_obj.map_streams(count_pages_in_stream))
             pages_total = 0
-            for line in dump_file_obj:
-                # NOTE: it is "<page>" and not u"<page>"
-                #       because bz2.BZ2File returns byte strings
-                if line.strip() == "<page>":
-                    pages_total += 1
+            tail = b""
+            for stream_offset, offset, block in self._blocks(dump_file_obj):
+                # NOTE prepend the last len(PAGE_OPEN) - 1 bytes of the previous block,
+                #      which cannot contain a whole marker,
+                #      to count the markers spanning two blocks
+                data = tail + block
+                pages_total += data.count(self.PAGE_OPEN)
+                tail = data[-(len(self.PAGE_OPEN) - 1):]
         return pages_total
 
-    def split(self, show_progress=False):
+    def build_page_index(self, page_index_file_path=None):
+        """
+        Scan the dump, writing the page index to file,
+        and its database (see open_page_index) next to it.
+
+        Return a tuple (page_index_file_path, pages_indexed).
+        """
+        def entries():
+            for raw_page in self.raw_pages:
+                if raw_page.contents is None:
+                    continue
+                yield PageIndexEntry(
+                    id=get_id(raw_page.contents),
+                    ns=raw_page.ns,
+                    stream_offset=raw_page.stream_offset,
+                    offset=raw_page.offset,
+                    length=len(raw_page.contents),
+                    title=get_title(raw_page.contents)
+                )
+        page_index_file_path = page_index_file_path or (self.dump_file_path + PAGE_INDEX_SUFFIX)
+        pages_indexed = PageIndex.write_file(entries(), page_index_file_path)
+        PageIndexDatabase.build(PageIndex.iter_file(page_index_file_path), page_index_file_path + PAGE_INDEX_DATABASE_SUFFIX)
+        return (page_index_file_path, pages_indexed)
+
+    def read_raw_pages(self, entries):
+        """
+        Read the pages corresponding to the given page index entries
+        directly from the dump, returning a list of byte strings.
+
+        Each bz2 stream is decompressed at most once.
+        Please note that in a single stream compressed dump
+        all the data preceding a page must be decompressed.
+        """
+        acc = []
+        if self.dump_file_path.endswith(u".xml.bz2"):
+            streams = dict()
+            for e in entries:
+                streams[e.stream_offset] = max(streams.get(e.stream_offset, 0), e.offset + e.length)
+            for stream_offset in streams:
+                streams[stream_offset] = decompress_range(self.dump_file_path, stream_offset, streams[stream_offset])
+            for e in entries:
+                acc.append(streams[e.stream_offset][e.offset:(e.offset + e.length)])
+        else:
+            pages = dict()
+            with open_file(self.dump_file_path) as dump_file:
+                # NOTE read in offset order, to avoid rewinding compressed files
+                for e in sorted(entries, key=lambda e: e.offset):
+                    dump_file.seek(e.offset)
+                    pages[e.offset] = dump_file.read(e.length)
+            acc = [pages[e.offset] for e in entries]
+        return acc
+
+    def fetch_pages(self, titles=[], ids=[], page_index_file_path=None):
+        """
+        Read the pages with the given titles or ids from the dump,
+        using the page index database to seek to them,
+        without reading the whole page index.
+
+        Return a Chunk containing the pages found.
+        """
+        with open_page_index(page_index_file_path or (self.dump_file_path + PAGE_INDEX_SUFFIX)) as page_index:
+            entries = [page_index.entry_for_title(t) for t in titles] + [page_index.entry_for_id(i) for i in ids]
+        entries = [e for e in entries if e is not None]
+        pages = self.read_raw_pages(entries)
+        return self._chunk(len(pages), len(pages), 1, pages, None)
+
+    @property
+    def checkpoint_settings(self):
+        """
+        The settings affecting the chunks,
+        which must not change when resuming a split.
+        """
+        return {
+            "namespaces": sorted(self.namespaces),
+            "pages_per_chunk": self.pages_per_chunk,
+            "bytes_per_chunk": self.bytes_per_chunk,
+            "max_number_pages": self.max_number_pages,
+            "skip_redirects": self.skip_redirects,
+            "output_compression": self.output_compression,
+            "sample_size": self.sample_size,
+            "sample_strata": self.sample_strata,
+            "sample_seed": self.sample_seed,
+            "shards": self.shards,
+            "shard_index": self.shard_index,
+            "shard_key": self.shard_key,
+        }
+
+    def _load_checkpoint(self, checkpoint_file_path):
+        """
+        Load the checkpoint from file, checking that it refers
+        to the current dump file and settings.
+        """
+        checkpoint = read_checkpoint(checkpoint_file_path)
+        if checkpoint is None:
+            return None
+        if (
+            (checkpoint.dump_file_path != os.path.abspath(self.dump_file_path)) or
+            (checkpoint.dump_file_size != os.path.getsize(self.dump_file_path))
+        ):
+            self.error(u"The checkpoint refers to a different dump file. (Got '%s')" % checkpoint.dump_file_path)
+        if checkpoint.settings != self.checkpoint_settings:
+            self.error(u"The checkpoint refers to different settings. (Got '%s')" % checkpoint.settings)
+        return checkpoint
+
+    def split(self, show_progress=False, resume=False):
         """
         Split the dump into chunks.
+
+        The chunks are compressed (if requested) and written to file
+        by a pool of writer_jobs threads, while the dump is being scanned.
+        At most 2 * writer_jobs chunks are waiting to be written at any time.
+
+        A manifest file is written in the output directory,
+        containing one JSON record per chunk, with its file path,
+        size in bytes, number of pages, first and last page id,
+        and SHA1 hash of the file contents.
+
+        After each chunk has been written, a checkpoint file is updated
+        with the position in the dump following the chunk.
+        If resume is True and a checkpoint file exists,
+        the split continues from there, instead of from the beginning.
+        Resuming is not possible when sampling,
+        since the chunks are created only at the end of the scan.
         """
+        if resume and (self.sample_size is not None):
+            self.error(u"Cannot resume a split with a random sample")
         if self.output_directory_path is None:
             self.output_directory_path = tempfile.mkdtemp()
         output_file_name_template = os.path.join(self.output_directory_path, self.output_file_prefix + u"%09d.xml")
-        pages_total = 0
-        pages_ns = 0
-        current_chunk_index = 0
-        for mwchunk in self.mwchunks:
-            file_path = output_file_name_template % (mwchunk.index)
-            with io.open(file_path, "w", encoding="utf-8") as chunk_file:
-                chunk_file.write(mwchunk.contents)
+        if self.output_compression is not None:
+            output_file_name_template += u"." + self.output_compression
+        manifest_file_path = os.path.join(self.output_directory_path, self.output_file_prefix + self.MANIFEST_FILE_NAME)
+        checkpoint_file_path = os.path.join(self.output_directory_path, self.output_file_prefix + self.CHECKPOINT_FILE_NAME)
+
+        # keep the manifest records of the chunks preceding the checkpoint, if resuming
+        self.checkpoint = self._load_checkpoint(checkpoint_file_path) if resume else None
+        manifest_records = []
+        if self.checkpoint is not None:
             if show_progress:
-                self.print_stderr(file_path)
+                self.print_stderr(u"Resuming after chunk %d" % self.checkpoint.index)
+            if os.path.isfile(manifest_file_path):
+                with io.open(manifest_file_path, "r", encoding="utf-8") as manifest_file:
+                    manifest_records = [l for l in manifest_file if json.loads(l)["index"] <= self.checkpoint.index]
+            if self.checkpoint.complete:
+                return (self.checkpoint.pages_total, self.checkpoint.pages_ns, self.checkpoint.index)
+
+        writer_jobs = self.writer_jobs or multiprocessing.cpu_count()
+        pool = ThreadPool(writer_jobs)
+        pending = deque()
+
+        def save_checkpoint(pages_total, pages_ns, index, end_position, complete):
+            stream_offset, offset = end_position or (0, 0)
+            write_checkpoint(Checkpoint(
+                dump_file_path=os.path.abspath(self.dump_file_path),
+                dump_file_size=os.path.getsize(self.dump_file_path),
+                settings=self.checkpoint_settings,
+                index=index,
+                pages_total=pages_total,
+                pages_ns=pages_ns,
+                stream_offset=stream_offset,
+                offset=offset,
+                complete=complete
+            ), checkpoint_file_path)
+
+        def wait_oldest(manifest_file):
+            (pages_total, pages_ns, index, end_position), result = pending.popleft()
+            record = result.get()
+            manifest_file.write(u"%s\n" % json.dumps(record, sort_keys=True))
+            manifest_file.flush()
+            save_checkpoint(pages_total, pages_ns, index, end_position, False)
+            if show_progress:
+                self.print_stderr(record["path"])
+
+        if self.checkpoint is None:
+            mwchunk = Chunk(0, 0, 0, b"", 0, None, None, None)
+        else:
+            mwchunk = Chunk(self.checkpoint.pages_total, self.checkpoint.pages_ns, self.checkpoint.index, b"", 0, None, None, None)
+        try:
+            with io.open(manifest_file_path, "w", encoding="utf-8") as manifest_file:
+                manifest_file.write(u"".join(manifest_records))
+                for mwchunk in self.mwchunks:
+                    file_path = output_file_name_template % (mwchunk.index)
+                    pending.append((
+                        (mwchunk.pages_total, mwchunk.pages_ns, mwchunk.index, mwchunk.end_position),
+                        pool.apply_async(write_chunk, (file_path, mwchunk, self.output_compression))
+                    ))
+                    if len(pending) >= 2 * writer_jobs:
+                        wait_oldest(manifest_file)
+                while len(pending) > 0:
+                    wait_oldest(manifest_file)
+        finally:
+            pool.terminate()
+            pool.join()
+        save_checkpoint(mwchunk.pages_total, mwchunk.pages_ns, mwchunk.index, mwchunk.end_position, True)
+        if show_progress:
+            self.print_stderr(manifest_file_path)
         return (mwchunk.pages_total, mwchunk.pages_ns, mwchunk.index)
 
+    def write_ndjson(self, output_file):
+        """
+        Write the pages to the given binary file object
+        (e.g., the standard output), as newline-delimited JSON records,
+        instead of splitting them into chunks.
+
+        The pages are filtered and sampled as for split().
+
+        Return a tuple (pages_total, pages_ns).
+        """
+        if self.sample_size is not None:
+            pages_total, pages = self._sample_pages()
+            for contents in pages:
+                output_file.write(format_record(contents))
+            output_file.flush()
+            return (pages_total, len(pages))
+        pages_total = 0
+        pages_ns = 0
+        for raw_page in self.raw_pages:
+            pages_total += 1
+            if raw_page.contents is None:
+                continue
+            output_file.write(format_record(raw_page.contents))
+            pages_ns += 1
+            if (self.max_number_pages is not None) and (pages_ns == self.max_number_pages):
+                break
+        output_file.flush()
+        return (pages_total, pages_ns)
+
+    def _blocks(self, dump_file_obj, start_position=(0, 0)):
+        """
+        A generator yielding the contents of the dump,
+        from the given ``(stream_offset, offset)`` position,
+        as a sequence of ``(stream_offset, offset, data)`` tuples,
+        where data is a (large) byte string, and offset is the offset
+        of its first byte inside the decompressed stream.
+        """
+        start_stream_offset, start_offset = start_position
+        if isinstance(dump_file_obj, MultistreamDump):
+            for stream_offset, data in dump_file_obj.map_streams(decompress_stream, start_offset=start_stream_offset):
+                if (stream_offset == start_stream_offset) and (start_offset > 0):
+                    yield (stream_offset, start_offset, data[start_offset:])
+                else:
+                    yield (stream_offset, 0, data)
+        else:
+            if start_offset > 0:
+                # NOTE for a compressed dump this decompresses up to start_offset
+                dump_file_obj.seek(start_offset)
+            offset = start_offset
+            for data in iter(lambda: dump_file_obj.read(self.BLOCK_SIZE), b""):
+                yield (0, offset, data)
+                offset += len(data)
+
+    @classmethod
+    def _page_ns(cls, buf, start, end):
+        """
+        Return the value of the <ns> element of the page
+        stored in buf[start:end], or None if not found.
+        """
+        ns_start = buf.find(cls.NS_OPEN, start, end)
+        if ns_start == -1:
+            return None
+        ns_start += len(cls.NS_OPEN)
+        ns_end = buf.find(cls.NS_CLOSE, ns_start, end)
+        try:
+            return int(buf[ns_start:ns_end])
+        except ValueError:
+            return None
+
+    def _accept_page(self, buf, start, header_end):
+        """
+        Decide whether the page starting at buf[start]
+        must be extracted, looking only at its header,
+        that is, the bytes before its <revision>.
+
+        Return a tuple (ns, accepted).
+        """
+        ns = self._page_ns(buf, start, header_end)
+        if (len(self.namespaces) > 0) and (ns not in self.namespaces):
+            return (ns, False)
+        if self.skip_redirects and (buf.find(self.REDIRECT_OPEN, start, header_end) != -1):
+            return (ns, False)
+        if (self.shards is not None) and (self._page_shard(buf, start, header_end) != self.shard_index):
+            return (ns, False)
+        return (ns, True)
+
+    def _page_shard(self, buf, start, end):
+        """
+        Return the shard of the page stored in buf[start:end],
+        hashing its id or its title, according to shard_key.
+        """
+        if self.shard_key == u"id":
+            # the first <id> is the page id, the revision follows the header
+            value = get_field(buf, b"id", start, end)
+            try:
+                key = int(value)
+            except (TypeError, ValueError):
+                key = None
+        else:
+            value = get_field(buf, b"title", start, end)
+            key = None if value is None else unescape(value.decode("utf-8"))
+        return shard_of(key, self.shards)
+
+    @property
+    def raw_pages(self):
+        """
+        A generator yielding a RawPage object
+        for each <page> in the dump,
+        starting from the checkpoint position, if any.
+
+        The dump is read in large blocks, and page boundaries
+        are located by searching the byte strings,
+        hence no line splitting or UTF-8 decoding is performed.
+        This is safe because in a MediaWiki dump
+        the "<" character is escaped inside text nodes.
+
+        Pages not in the requested namespaces (or redirects,
+        if skip_redirects is set, or pages assigned to other shards,
+        if shards is set) are rejected as soon as
+        their header has been read: their bytes are skipped
+        without being copied, and the yielded RawPage
+        has contents set to None.
+        """
+        def position(segments, index):
+            # segments is a list of (buf_index, stream_offset, offset)
+            # telling that buf[buf_index] is at the given offset
+            # inside the decompressed stream starting at stream_offset
+            for buf_index, stream_offset, offset in reversed(segments):
+                if buf_index <= index:
+                    return (stream_offset, offset + index - buf_index)
+            return (None, None)
+
+        filtering = (len(self.namespaces) > 0) or self.skip_redirects or (self.shards is not None)
+        start_position = (0, 0)
+        if self.checkpoint is not None:
+            start_position = (self.checkpoint.stream_offset, self.checkpoint.offset)
+        dump_file_obj = self.dump_file_obj if self.dump_file_obj is not None else self.open()
+        with dump_file_obj:
+            buf = b""
+            pos = 0
+            close_from = 0
+            segments = []
+            # the rejected page being skipped, if any
+            skipped = None
+            blocks = self._blocks(dump_file_obj, start_position)
+            if self.blocks_wrapper is not None:
+                blocks = self.blocks_wrapper(blocks)
+            for stream_offset, offset, block in blocks:
+                # drop the already consumed bytes
+                buf = buf[pos:] + block
+                close_from -= pos
+                segments = [(i - pos, so, o) for (i, so, o) in segments]
+                while (len(segments) > 1) and (segments[1][0] <= 0):
+                    del segments[0]
+                if (len(segments) > 0) and (segments[0][0] < 0):
+                    i, so, o = segments[0]
+                    segments[0] = (0, so, o - i)
+                if (len(segments) == 0) or (segments[-1][1] != stream_offset):
+                    segments.append((len(buf) - len(block), stream_offset, offset))
+                pos = 0
+                while True:
+                    if skipped is not None:
+                        end = buf.find(self.PAGE_CLOSE, max(pos, close_from))
+                        if end == -1:
+                            # keep only the tail, it might contain a truncated "</page>"
+                            pos = max(pos, len(buf) - len(self.PAGE_CLOSE) + 1)
+                            close_from = pos
+                            break
+                        yield skipped
+                        skipped = None
+                        pos = end + len(self.PAGE_CLOSE)
+                        close_from = pos
+                    start = buf.find(self.PAGE_OPEN, pos)
+                    if start == -1:
+                        # keep the tail, it might contain a truncated "<page>"
+                        pos = max(pos, len(buf) - len(self.PAGE_OPEN) + 1)
+                        close_from = pos
+                        break
+                    end = buf.find(self.PAGE_CLOSE, max(start, close_from))
+                    if filtering:
+                        header_end = buf.find(self.REVISION_OPEN, start, len(buf) if end == -1 else end)
+                        if header_end == -1:
+                            header_end = end
+                        if header_end == -1:
+                            # the page header continues in the next block
+                            pos = start
+                            close_from = max(start, len(buf) - len(self.PAGE_CLOSE) + 1)
+                            break
+                        ns, accepted = self._accept_page(buf, start, header_end)
+                    else:
+                        ns, accepted = None, True
+                    page_stream_offset, page_offset = position(segments, start)
+                    if not accepted:
+                        # skip the rest of the page, without copying it
+                        skipped = RawPage(ns, page_stream_offset, page_offset, None)
+                        pos = start
+                        close_from = start
+                        continue
+                    if end == -1:
+                        # the page continues in the next block
+                        pos = start
+                        close_from = max(start, len(buf) - len(self.PAGE_CLOSE) + 1)
+                        break
+                    end += len(self.PAGE_CLOSE)
+                    if not filtering:
+                        ns = self._page_ns(buf, start, end)
+                    yield RawPage(ns, page_stream_offset, page_offset, buf[start:end])
+                    pos = end
+                    close_from = end
+
+    def _chunk(self, pages_total, pages_ns, index, pages, end_position):
+        """
+        Create a Chunk holding the given pages (byte strings),
+        wrapped inside a <mediawiki> element.
+        """
+        contents = self.MEDIAWIKI_OPEN + b"  " + b"\n  ".join(pages) + b"\n" + self.MEDIAWIKI_CLOSE
+        first_id = get_id(pages[0]) if len(pages) > 0 else None
+        last_id = get_id(pages[-1]) if len(pages) > 0 else None
+        return Chunk(pages_total, pages_ns, index, contents, len(pages), first_id, last_id, end_position)
+
+    def _chunk_is_full(self, num_pages, num_bytes):
+        """
+        Return True if a chunk with the given number of pages and bytes
+        must be closed, according to pages_per_chunk and bytes_per_chunk.
+        """
+        return (
+            ((self.pages_per_chunk is not None) and (num_pages >= self.pages_per_chunk)) or
+            ((self.bytes_per_chunk is not None) and (num_bytes >= self.bytes_per_chunk))
+        )
+
     @property
     def mwchunks(self):
         """
         A generator to loop through the MWChunk objects in the dump.
+
+        The contents of each chunk is a UTF-8 encoded byte string.
+
+        A chunk is closed when it contains pages_per_chunk pages
+        or when its pages amount to at least bytes_per_chunk bytes,
+        whichever comes first (a None value means no limit).
+
+        If a checkpoint is set, the chunks are generated
+        from the checkpoint position, and their counters
+        continue from the checkpoint values.
+
+        If sample_size is set, the chunks contain
+        a random sample of the pages instead (see sampled_mwchunks).
         """
+        if self.sample_size is not None:
+            for mwchunk in self.sampled_mwchunks:
+                yield mwchunk
+            return
         pages_total = 0
         pages_ns = 0
-        in_page = False
-        current_page_lines = []
-        current_page_has_ns = None
-        current_chunk_lines = []
+        current_chunk_pages = []
+        current_chunk_bytes = 0
         current_chunk_index = 0
-        pages_in_current_chunk = 0
-        with self.open() as dump_file_obj:
-            for line in dump_file_obj:
-                # convert bytes to Unicode object via UTF-8
-                line = line.decode("utf-8")
-                line_stripped = line.strip()
-                if in_page:
-                    # inside <page>
-                    if current_page_has_ns is None:
-                        # we haven't find <ns>...</ns> yet, so check the current line
-                        m = re.match(self.NS_REGEX, line.strip())
-                        if m is not None:
-                            # the current line is the <ns>...</ns> line, set the current_page_has_ns flag
-                            try:
-                                current_page_has_ns = int(m.group(1)) in self.namespaces
-                            except:
-                                pass
-                    # append contents to tmp buffer
-                    current_page_lines.append(line)
-                    if line_stripped == "</page>":
-                        # we are done with this page
-                        if current_page_has_ns:
-                            # add current page to current chunk
-                            current_chunk_lines.extend(current_page_lines)
-                            pages_in_current_chunk += 1
-                            pages_ns += 1
-                            if (self.max_number_pages is not None) and (pages_ns == self.max_number_pages):
-                                # output chunk and exit
-                                current_chunk_index += 1
-                                current_chunk_contents = self.MEDIAWIKI_OPEN + u"".join(current_chunk_lines) + self.MEDIAWIKI_CLOSE
-                                yield Chunk(pages_total, pages_ns, current_chunk_index, current_chunk_contents)
-                                return
-                            if pages_in_current_chunk == self.pages_per_chunk:
-                                # output chunk 
-                                current_chunk_index += 1
-                                current_chunk_contents = self.MEDIAWIKI_OPEN + u"".join(current_chunk_lines) + self.MEDIAWIKI_CLOSE
-                                yield Chunk(pages_total, pages_ns, current_chunk_index, current_chunk_contents)
-                                pages_in_current_chunk = 0
-                                current_chunk_lines = []
-                                current_page_lines = []
-                        #else:
-                        #    # do not add page, it does not have the right ns
-                        #    pass
-                        in_page = False
-                else:
-                    # waiting for the next <page>
-                    if line_stripped == "<page>":
-                        # open a new page
-                        in_page = True
-                        pages_total += 1
-                        current_page_lines = [line]
-                        if len(self.namespaces) == 0:
-                            # no namespaces => output them all
-                            current_page_has_ns = True
-                        else:
-                            # namespaces => set to None, so that we will match the page ns against the wanted ones
-                            current_page_has_ns = None
-            if pages_in_current_chunk > 0:
-                # output last chunk, if any
+        end_position = None
+        if self.checkpoint is not None:
+            pages_total = self.checkpoint.pages_total
+            pages_ns = self.checkpoint.pages_ns
+            current_chunk_index = self.checkpoint.index
+        for raw_page in self.raw_pages:
+            pages_total += 1
+            if raw_page.contents is None:
+                # do not add page, it does not have the right ns (or it is a redirect)
+                continue
+            # add current page to current chunk
+            current_chunk_pages.append(raw_page.contents)
+            current_chunk_bytes += len(raw_page.contents)
+            end_position = (raw_page.stream_offset, raw_page.offset + len(raw_page.contents))
+            pages_ns += 1
+            if (self.max_number_pages is not None) and (pages_ns == self.max_number_pages):
+                # output chunk and exit
                 current_chunk_index += 1
-                current_chunk_contents = self.MEDIAWIKI_OPEN + u"".join(current_chunk_lines) + self.MEDIAWIKI_CLOSE
-                yield Chunk(pages_total, pages_ns, current_chunk_index, current_chunk_contents)
+                yield self._chunk(pages_total, pages_ns, current_chunk_index, current_chunk_pages, end_position)
+                return
+            if self._chunk_is_full(len(current_chunk_pages), current_chunk_bytes):
+                # output chunk
+                current_chunk_index += 1
+                yield self._chunk(pages_total, pages_ns, current_chunk_index, current_chunk_pages, end_position)
+                current_chunk_pages = []
+                current_chunk_bytes = 0
+        if len(current_chunk_pages) > 0:
+            # output last chunk, if any
+            current_chunk_index += 1
+            yield self._chunk(pages_total, pages_ns, current_chunk_index, current_chunk_pages, end_position)
+
+    def _sample_pages(self):
+        """
+        Scan the dump, drawing a uniform random sample of sample_size pages
+        (among those with the requested namespaces, if any,
+        and among the first max_number_pages of them, if set)
+        by reservoir sampling.
+
+        If sample_strata is set, the sample is stratified
+        by page namespace or by title prefix,
+        each stratum contributing proportionally to its size.
+
+        Return a tuple (pages_total, pages),
+        where pages is the list of the sampled raw pages, in dump order.
+        """
+        sampler = ReservoirSampler(self.sample_size, seed=self.sample_seed)
+        pages_total = 0
+        pages_accepted = 0
+        for raw_page in self.raw_pages:
+            pages_total += 1
+            if raw_page.contents is None:
+                continue
+            stratum = None
+            if self.sample_strata == u"ns":
+                stratum = raw_page.ns
+            elif self.sample_strata == u"prefix":
+                stratum = title_prefix(get_title(raw_page.contents))
+            sampler.add(raw_page.contents, stratum=stratum)
+            pages_accepted += 1
+            if (self.max_number_pages is not None) and (pages_accepted == self.max_number_pages):
+                break
+        return (pages_total, sampler.sample)
 
+    @property
+    def sampled_mwchunks(self):
+        """
+        A generator to loop through MWChunk objects
+        containing a random sample of sample_size pages (see _sample_pages).
+
+        The chunks are created only after the whole dump has been scanned.
+        """
+        pages_total, pages = self._sample_pages()
+        pages_ns = 0
+        current_chunk_pages = []
+        current_chunk_bytes = 0
+        current_chunk_index = 0
+        for contents in pages:
+            current_chunk_pages.append(contents)
+            current_chunk_bytes += len(contents)
+            pages_ns += 1
+            if self._chunk_is_full(len(current_chunk_pages), current_chunk_bytes):
+                current_chunk_index += 1
+                yield self._chunk(pages_total, pages_ns, current_chunk_index, current_chunk_pages, None)
+                current_chunk_pages = []
+                current_chunk_bytes = 0
+        if len(current_chunk_pages) > 0:
+            current_chunk_index += 1
+            yield self._chunk(pages_total, pages_ns, current_chunk_index, current_chunk_pages, None)
 
 
 def main():
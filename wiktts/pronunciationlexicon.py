@@ -13,6 +13,7 @@ import unicodedata
 from ipapy.compatibility import to_unicode_string
 from ipapy.compatibility import unicode_to_hex
 
+from wiktts.externalsort import external_sort
 from wiktts.lexicon import Lexicon
 from wiktts.lexicon import LexiconEntry
 from wiktts.wordpronunciationpair import WordPronunciationPair
@@ -159,13 +160,22 @@ class PronunciationLexicon(Lexicon):
     def format_phones(self):
         return sorted([(u"%s\t%s (%s)" % (p.unicode_repr, p.name, unicode_to_hex(p.unicode_repr))) for p in self.phones])
 
-    def format_lexicon(self, template=None, comment_invalid=False, comment=u"#", sort=False):
+    def format_lexicon(self, template=None, comment_invalid=False, comment=u"#", sort=False, sort_memory=None):
+        """
+        Format the selected entries with the given template.
+
+        If sort is True, return an ExternalSorter
+        (using at most sort_memory MB, see wiktts.externalsort)
+        yielding the formatted entries in sorted order,
+        which the caller must close to remove its temporary files,
+        otherwise return a list.
+        """
         template = to_unicode_string(template) or self.DEFAULT_TEMPLATE[(self.include_valid, self.include_invalid)]
         comment_string = comment if comment_invalid else u""
-        formatted_data = [e.format(template, comment_string) for e in self]
+        formatted_data = (e.format(template, comment_string) for e in self)
         if sort:
-            return sorted(formatted_data)
-        return formatted_data 
+            return external_sort(formatted_data, memory_budget=sort_memory)
+        return list(formatted_data)
 
     def pretty_print_stats(self):
         total = len(self)
@@ -11,6 +11,8 @@ import io
 import os
 import shutil
 
+from wiktts.externalsort import external_sort
+
 __author__ = "Alberto Pettarin"
 __copyright__ = "Copyright 2016, Alberto Pettarin (www.albertopettarin.it)"
 __license__ = "MIT"
@@ -33,29 +35,29 @@ class Tool(object):
     def format_test(self):
         return self._format_g2p_input(self.lexicon.test_lexicon)
 
-    def format_tab(self, train=False, test=True, sort=False):
-        def format_entries(entries):
-            return [u"%s\t%s" % (e.filtered.word_unicode, u" ".join(e.value)) for e in entries]
+    def _lexica(self, train, test):
         acc = []
         if train:
-            acc.extend(format_entries(self.lexicon.train_lexicon))
+            acc.append(self.lexicon.train_lexicon)
         if test:
-            acc.extend(format_entries(self.lexicon.test_lexicon))
-        if sort:
-            return sorted(acc)
+            acc.append(self.lexicon.test_lexicon)
         return acc
 
-    def format_words(self, train=False, test=True, sort=False):
-        def format_list(entries):
-            return [e.filtered.word_unicode for e in entries]
-        acc = []
-        if train:
-            acc.extend(format_list(self.lexicon.train_lexicon))
-        if test:
-            acc.extend(format_list(self.lexicon.test_lexicon))
+    def format_tab(self, train=False, test=True, sort=False, sort_memory=None):
+        # NOTE if sorting, return an ExternalSorter (see wiktts.externalsort)
+        #      using at most sort_memory MB, which the caller must close
+        acc = (u"%s\t%s" % (e.filtered.word_unicode, u" ".join(e.value)) for l in self._lexica(train, test) for e in l)
         if sort:
-            return sorted(acc)
-        return acc
+            return external_sort(acc, memory_budget=sort_memory)
+        return list(acc)
+
+    def format_words(self, train=False, test=True, sort=False, sort_memory=None):
+        # NOTE if sorting, return an ExternalSorter (see wiktts.externalsort)
+        #      using at most sort_memory MB, which the caller must close
+        acc = (e.filtered.word_unicode for l in self._lexica(train, test) for e in l)
+        if sort:
+            return external_sort(acc, memory_budget=sort_memory)
+        return list(acc)
 
     def format_symbols(self, train=False, test=True, sort=True):
         def format_set(phones):
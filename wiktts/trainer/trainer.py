@@ -14,6 +14,7 @@ from ipapy.mapper import Mapper
 
 from wiktts import write_file
 from wiktts.commandlinetool import CommandLineTool
+from wiktts.externalsort import DEFAULT_MEMORY_BUDGET
 from wiktts.mappedpronunciationlexicon import MappedPronunciationLexicon
 from wiktts.trainer.tool import TOOLS
 
@@ -110,6 +111,13 @@ class Trainer(CommandLineTool):
             "default": 0.9,
             "help": "Size of the train set relative to valid lexicon size (default: 0.9)"
         },
+        {
+            "name": "--sort-memory",
+            "nargs": "?",
+            "type": int,
+            "default": DEFAULT_MEMORY_BUDGET,
+            "help": "Sort the tab and words files using at most this memory (in MB), spilling sorted runs to temporary files (default: %d)" % DEFAULT_MEMORY_BUDGET
+        },
         {
             "name": "--stats",
             "action": "store_true",
@@ -201,7 +209,7 @@ class Trainer(CommandLineTool):
         write_file(contents, script_file_path)
         return [script_file_path]
 
-    def output_ml_files(self, base):
+    def output_ml_files(self, base, sort_memory=None):
         acc = []
         acc.append(base + u".train")
         write_file(self.tool.format_train(), acc[-1])
@@ -220,9 +228,11 @@ class Trainer(CommandLineTool):
         acc.append(base + u".test.symbols")
         write_file(self.tool.format_symbols(train=False, test=True), acc[-1])
         acc.append(base + u".tab")
-        write_file(self.tool.format_tab(train=True, test=True, sort=True), acc[-1])
+        with self.tool.format_tab(train=True, test=True, sort=True, sort_memory=sort_memory) as sorted_data:
+            write_file(sorted_data, acc[-1])
         acc.append(base + u".words")
-        write_file(self.tool.format_words(train=True, test=True, sort=True), acc[-1]) 
+        with self.tool.format_words(train=True, test=True, sort=True, sort_memory=sort_memory) as sorted_data:
+            write_file(sorted_data, acc[-1])
         acc.append(base + u".symbols")
         write_file(self.tool.format_symbols(train=True, test=True), acc[-1])
         return acc
@@ -244,6 +254,7 @@ class Trainer(CommandLineTool):
         train_size = self.vargs["train_size_frac"] if self.vargs["train_size_int"] is None else self.vargs["train_size_int"]
         script_only = self.vargs["script_only"]
         script_parameters = self.vargs["script_parameters"]
+        sort_memory = self.vargs["sort_memory"]
        
         # options controlling print behavior
         print_stats = self.vargs["stats"] 
@@ -256,6 +267,8 @@ class Trainer(CommandLineTool):
             self.error(u"The available tools are: %s. (Got: '%s')" % (TOOLS.keys(), tool_name))
         if mapper_name not in MAPPERS:
             self.error(u"The available mappers are: %s. (Got: '%s')" % (MAPPERS, mapper_name))
+        if sort_memory < 1:
+            self.error(u"The sort memory must be at least 1 MB. (Got '%d')" % sort_memory)
         self.tool = TOOLS[tool_name]
         base = os.path.join(self.output_directory_path, os.path.basename(lexicon_file_path))
 
@@ -280,7 +293,7 @@ class Trainer(CommandLineTool):
         )
         
         # output ML files for tool
-        created_files.extend(self.output_ml_files(base))
+        created_files.extend(self.output_ml_files(base, sort_memory=sort_memory))
         
         # output stats
         stats = []